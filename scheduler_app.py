@@ -2,7 +2,10 @@
 import streamlit as st
 import pandas as pd
 from datetime import time, datetime # Import datetime for parsing convenience
-from scheduler_logic import create_schedule, parse_time_input # Assuming your logic is in scheduler_logic.py
+from time import sleep
+from scheduler_logic import parse_time_input, ScheduleCheckpoints, SLOT_MINUTES_CHOICES, DEFAULT_SLOT_MINUTES, NO_SLOTS_MESSAGE # Assuming your logic is in scheduler_logic.py
+from scheduler_export import FILE_EXTENSIONS, MIME_TYPES
+from scheduler_background import schedule_cache_key, ScheduleResultCache, ScheduleTask
 
 # --- Page Configuration (Optional but good practice) ---
 st.set_page_config(page_title="Employee Scheduler", layout="wide")
@@ -13,6 +16,24 @@ st.write("Fill in the details to generate the schedule.")
 # --- Consistent Reference Date for Time Parsing ---
 REF_DATE_FOR_PARSING = datetime(1970, 1, 1).date()
 
+# --- Engine checkpoints from the previous run, so re-generating after an edit only recomputes
+# the slots from the first one the edit affects ---
+if "schedule_checkpoints" not in st.session_state:
+    st.session_state.schedule_checkpoints = ScheduleCheckpoints()
+
+# --- Generation runs on a worker thread; these survive reruns (e.g. a click on Cancel or a download) ---
+if "schedule_task" not in st.session_state:
+    st.session_state.schedule_task = None # ScheduleTask still being generated, if any
+    st.session_state.schedule_key = None  # cache key of the schedule on display
+
+SCHEDULE_CACHE_ENTRIES = 32
+PROGRESS_POLL_SECONDS = 0.1
+
+# Finished schedules by normalized inputs, shared by every session of this server
+@st.cache_resource
+def schedule_result_cache():
+    return ScheduleResultCache(max_entries=SCHEDULE_CACHE_ENTRIES)
+
 # --- Input Sections ---
 st.sidebar.header("Configuration")
 
@@ -20,6 +41,7 @@ st.sidebar.header("Configuration")
 st.sidebar.subheader("Store Hours")
 store_open_time_str = st.sidebar.text_input("Store Open Time (e.g., 08:00 AM)", "")
 store_close_time_str = st.sidebar.text_input("Store Close Time (e.g., 11:00 PM)", "")
+slot_minutes = st.sidebar.selectbox("Slot Length (minutes)", SLOT_MINUTES_CHOICES, index=SLOT_MINUTES_CHOICES.index(DEFAULT_SLOT_MINUTES))
 
 # Number of Employees
 st.sidebar.subheader("Employees")
@@ -75,32 +97,78 @@ if st.sidebar.button("Generate Schedule"):
                 # For Streamlit, it's good to provide immediate feedback if possible.
 
             if valid_employee_data:
-                st.info("Generating schedule... Please wait.")
-                try:
-                    # Call your scheduling logic
-                    schedule_csv_string = create_schedule(store_open_time_obj, store_close_time_obj, employee_data_list)
-                    
-                    st.success("Schedule Generated Successfully!")
-                    
-                    # Display the schedule
-                    st.subheader("Generated Schedule (CSV Format)")
-                    st.text_area("CSV Output", schedule_csv_string, height=400)
-                    
-                    # Provide download button
-                    st.download_button(
-                        label="Download Schedule as CSV",
-                        data=schedule_csv_string,
-                        file_name="schedule.csv",
-                        mime="text/csv",
-                    )
-                except Exception as e:
-                    st.error(f"An error occurred during schedule generation: {e}")
-                    # You might want to print more detailed traceback for debugging if running locally
-                    # import traceback
-                    # st.text(traceback.format_exc())
+                cache_key = schedule_cache_key(store_open_time_obj, store_close_time_obj, employee_data_list, slot_minutes)
+                previous_task = st.session_state.schedule_task
+                if previous_task is not None and previous_task.cache_key != cache_key:
+                    # The new request replaces a run for other inputs; only one run per session touches the checkpoints
+                    previous_task.cancel(); previous_task.join()
+                    st.session_state.schedule_task = None
+                if st.session_state.schedule_task is None: # else these inputs are generating already and the progress block waits for them
+                    if schedule_result_cache().get(cache_key) is not None:
+                        st.session_state.schedule_key = cache_key # same inputs as a schedule already generated
+                    else:
+                        st.session_state.schedule_task = ScheduleTask(store_open_time_obj, store_close_time_obj, employee_data_list, slot_minutes,
+                                                                      checkpoints=st.session_state.schedule_checkpoints, cache_key=cache_key).start()
             else:
                 st.warning("Please correct the employee data errors above.")
 
+# --- Progress of the running generation. Clicking Cancel reruns the page, which picks the task up again here ---
+schedule_task = st.session_state.schedule_task
+if schedule_task is not None:
+    if schedule_task.is_running():
+        if st.button("Cancel", key="cancel_schedule"): schedule_task.cancel()
+        progress_bar = st.progress(0.0, text="Generating schedule...")
+        while schedule_task.is_running():
+            total_slots = schedule_task.total_slots
+            progress_bar.progress(schedule_task.progress, text=f"Generating schedule... slot {schedule_task.slots_done} of {total_slots}" if total_slots else "Generating schedule...")
+            sleep(PROGRESS_POLL_SECONDS)
+        progress_bar.empty()
+    st.session_state.schedule_task = None
+    if schedule_task.cancelled:
+        st.info("Schedule generation cancelled.")
+    elif schedule_task.error:
+        st.error(f"An error occurred during schedule generation: {schedule_task.error}")
+    else:
+        schedule_result_cache().put(schedule_task.cache_key, schedule_task.outcome)
+        st.session_state.schedule_key = schedule_task.cache_key
+
+# --- The schedule on display, served from the cache so reruns and downloads do not regenerate it ---
+generated = schedule_result_cache().get(st.session_state.schedule_key) if st.session_state.schedule_key is not None else None
+if generated is not None:
+    if generated.result is None:
+        st.warning(NO_SLOTS_MESSAGE)
+    else:
+        st.success("Schedule Generated Successfully!")
+        
+        # Display the schedule
+        st.subheader("Generated Schedule (CSV Format)")
+        st.text_area("CSV Output", generated.csv_bytes.decode("utf-8"), height=400)
+        
+        # Provide download button
+        st.download_button(
+            label="Download Schedule as CSV",
+            data=generated.csv_bytes,
+            file_name="schedule.csv",
+            mime="text/csv",
+        )
+        
+        for table_name, table_bytes in generated.columnar_exports.items():
+            st.download_button(
+                label=f"Download {table_name.title()} Table ({generated.export_format.upper()})",
+                data=table_bytes,
+                file_name=f"schedule_{table_name}{FILE_EXTENSIONS[generated.export_format]}",
+                mime=MIME_TYPES[generated.export_format],
+            )
+        
+        # Where the time went for the run that generated this schedule, and what the slot loop did
+        with st.expander("Diagnostics"):
+            schedule_stats = generated.stats
+            st.metric("Total time", f"{schedule_stats.total_seconds * 1000:.1f} ms")
+            st.dataframe(pd.DataFrame({"Phase": list(schedule_stats.phase_seconds),
+                                       "Time (ms)": [s * 1000 for s in schedule_stats.phase_seconds.values()]}), hide_index=True)
+            st.dataframe(pd.DataFrame({"Counter": list(schedule_stats.counters), "Value": list(schedule_stats.counters.values())}), hide_index=True)
+            st.caption("Counters cover the whole day; resumed_slots of its slots were replayed from the previous run.")
+
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("Ensure all time inputs are in a recognizable format (e.g., '9:00 AM', '14:30').")
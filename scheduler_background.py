@@ -0,0 +1,115 @@
+# File: scheduler_background.py
+# Background schedule generation for the app. A ScheduleTask runs the engine on a worker thread and reports
+# per-slot progress while the page stays responsive; it can be cancelled between slots. Finished schedules go
+# into a ScheduleResultCache keyed on the normalized inputs, so re-rendering or downloading the same schedule
+# does not run the engine again.
+import threading
+from collections import OrderedDict, namedtuple
+from time import perf_counter
+
+from scheduler_logic import iter_schedule_rows, parse_time_input, ScheduleResult, ScheduleStats, REF_DATE_FOR_PARSING, DEFAULT_SLOT_MINUTES
+from scheduler_export import default_columnar_format, export_schedule
+
+ROSTER_TIME_FIELDS = ("Shift Start", "Shift End", "Break", "ToffTL Start", "ToffTL End")
+DEFAULT_CACHE_ENTRIES = 32
+
+# A finished run: the ScheduleResult (None when the roster produced no slots), its CSV bytes, the typed
+# {"wide", "long"} exports in export_format, and the run's ScheduleStats
+GeneratedSchedule = namedtuple("GeneratedSchedule", ["result", "csv_bytes", "columnar_exports", "export_format", "stats"])
+
+# Time of day a roster/store time parses to, or None when the engine would ignore it (blank or unparsable)
+def _normalized_time(time_val):
+    parsed = parse_time_input(time_val, REF_DATE_FOR_PARSING)
+    return None if parsed is None else parsed.time()
+
+# Hashable cache key for one schedule. Times are compared by the time of day they parse to, so "9:00 AM" and
+# "09:00" share an entry; names are kept exactly as typed because they end up in the schedule's cells.
+def schedule_cache_key(store_open_time_obj, store_close_time_obj, employee_data_list, slot_minutes=DEFAULT_SLOT_MINUTES):
+    roster = tuple((emp.get("Name"),) + tuple(_normalized_time(emp.get(field)) for field in ROSTER_TIME_FIELDS) for emp in employee_data_list)
+    return (store_open_time_obj, store_close_time_obj, slot_minutes, roster)
+
+# Least-recently-used cache of GeneratedSchedule entries holding at most max_entries; safe to share between
+# sessions and threads
+class ScheduleResultCache:
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None: self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry; self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+# Builds the result, CSV bytes and columnar exports of one schedule on a daemon thread. Poll progress,
+# slots_done and total_slots while is_running(); afterwards exactly one of outcome (a GeneratedSchedule), error
+# ("ExceptionType: message") or cancelled is set. A thread rather than a process, so the engine can keep using
+# the session's checkpoints; the slot loop only holds the GIL between the page's short polls.
+class ScheduleTask:
+    def __init__(self, store_open_time_obj, store_close_time_obj, employee_data_list, slot_minutes=DEFAULT_SLOT_MINUTES, checkpoints=None, cache_key=None):
+        self.args = (store_open_time_obj, store_close_time_obj, employee_data_list, checkpoints)
+        self.slot_minutes = slot_minutes
+        self.cache_key = cache_key
+        self.stats = ScheduleStats()
+        self.slots_done = 0
+        self.outcome = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="schedule-task", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            result = None
+            for slot_minute, row_data in iter_schedule_rows(*self.args, stats=self.stats, slot_minutes=self.slot_minutes):
+                if self._cancel.is_set(): return # dropping the generator unfinished leaves the checkpoints as they were
+                if result is None: result = ScheduleResult([k for k in row_data if k != "Time"])
+                result.add_row(slot_minute, row_data); self.slots_done += 1
+            if result is None:
+                self.outcome = GeneratedSchedule(None, None, {}, None, self.stats); return
+            # CSV bytes written straight from the structured result, and the typed exports for analytics:
+            # Parquet when pyarrow is installed, JSON lines otherwise
+            t0 = perf_counter()
+            csv_bytes = result.to_csv_bytes(); export_format = default_columnar_format()
+            columnar_exports = export_schedule(result, export_format)
+            self.stats.lap("export", t0)
+            self.outcome = GeneratedSchedule(result, csv_bytes, columnar_exports, export_format, self.stats)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    # Number of slots in the day, known once the engine has laid out the timeline (None before that)
+    @property
+    def total_slots(self):
+        return self.stats.counters.get("slots")
+
+    # Fraction of the slots scheduled so far, 0.0 to 1.0
+    @property
+    def progress(self):
+        total = self.total_slots
+        return min(self.slots_done / total, 1.0) if total else 0.0
+
+    # Asks the worker to stop before its next slot; join() waits for it
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set() and self.outcome is None and self.error is None
+
+    def is_running(self):
+        return self._thread.is_alive()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
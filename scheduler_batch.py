@@ -0,0 +1,78 @@
+# File: scheduler_batch.py
+# Batch scheduling for many store-days at once (e.g. every store for a full week).
+# Jobs run on a process pool whose workers are started once and warmed up, so the
+# pandas import and first-call setup are paid once per worker instead of once per job.
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, BrokenExecutor, FIRST_COMPLETED, wait
+from datetime import time
+
+from scheduler_logic import create_schedule, DEFAULT_SLOT_MINUTES
+
+# One store-day: hours as datetime.time objects, the roster in the same format the app builds and the row length
+ScheduleJob = namedtuple("ScheduleJob", ["job_id", "store_open_time_obj", "store_close_time_obj", "employee_data_list", "slot_minutes"],
+                         defaults=[DEFAULT_SLOT_MINUTES])
+# schedule_csv is None when the job failed; error then holds "ExceptionType: message"
+ScheduleJobResult = namedtuple("ScheduleJobResult", ["job_id", "schedule_csv", "error"])
+
+# Run once in every worker process before it takes jobs
+def _warm_worker():
+    create_schedule(time(9, 0), time(17, 0), [{"Name": "Warm Up", "Shift Start": "9:00 AM", "Shift End": "10:00 AM"}])
+
+def _run_job(job):
+    try:
+        return ScheduleJobResult(job.job_id, create_schedule(job.store_open_time_obj, job.store_close_time_obj, job.employee_data_list,
+                                                             slot_minutes=job.slot_minutes), None)
+    except Exception as e:
+        return ScheduleJobResult(job.job_id, None, f"{type(e).__name__}: {e}")
+
+# Result of a job that never ran; the job may be malformed, so its id is read by position where possible
+def _failed_job(job, e):
+    try: job_id = job[0]
+    except Exception: job_id = None
+    return ScheduleJobResult(job_id, None, f"{type(e).__name__}: {e}")
+
+# Reusable pool of warm scheduling workers. Use as a context manager and call run() as many times as
+# needed; the same worker processes serve every call until the runner is closed.
+class ScheduleBatchRunner:
+    def __init__(self, max_workers=None, max_pending_per_worker=4):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = self.max_workers * max_pending_per_worker
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_worker)
+
+    # Yields a ScheduleJobResult for every job as soon as it finishes (not in submission order).
+    # jobs is any iterable of ScheduleJob (or tuples in the same order) and is consumed lazily, so only a
+    # bounded number of jobs are queued at a time. A failing job is reported through its result's error
+    # field and does not stop the rest of the batch.
+    def run(self, jobs):
+        jobs = iter(jobs); pending = {}
+        while True:
+            for job in jobs:
+                try: job = ScheduleJob(*job); future = self._pool.submit(_run_job, job)
+                except BrokenExecutor as e: # a worker died and the pool takes no more jobs, so the rest of the batch fails
+                    yield _failed_job(job, e)
+                    for job in jobs: yield _failed_job(job, e)
+                    break
+                except Exception as e: yield _failed_job(job, e); continue # e.g. the wrong number of fields
+                pending[future] = job.job_id
+                if len(pending) >= self.max_pending: break
+            if not pending: return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                job_id = pending.pop(future)
+                try: yield future.result()
+                except Exception as e: yield ScheduleJobResult(job_id, None, f"{type(e).__name__}: {e}") # e.g. a worker crashed
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# One-off batch: starts a pool, streams the results and shuts the pool down afterwards
+def run_schedule_batch(jobs, max_workers=None):
+    with ScheduleBatchRunner(max_workers=max_workers) as runner:
+        yield from runner.run(jobs)
@@ -0,0 +1,147 @@
+# File: scheduler_benchmark.py
+# Benchmarks create_schedule on seeded synthetic rosters and times each phase separately.
+#
+#   python scheduler_benchmark.py -o bench.json                        # run and save results
+#   python scheduler_benchmark.py --compare bench.json                 # run, flag regressions against a baseline
+#   python scheduler_benchmark.py --sizes 5 50 500 --stores day 24h --repeat 5
+#   python scheduler_benchmark.py --slot-minutes 5                    # 5-minute rows instead of 30
+#
+# Every run also records a digest of each generated schedule. --compare fails when a digest differs from the
+# baseline's, so a faster code path that changes the schedule is caught as well as one that got slower.
+import argparse
+import hashlib
+import json
+import platform
+import random
+import sys
+import time as timer
+from datetime import time
+
+import scheduler_logic as sl
+
+DEFAULT_SIZES = (5, 25, 100, 250, 500)
+# Store hours per store kind: (open, close); equal times mean open around the clock
+STORE_HOURS = {"day": (time(6, 0), time(22, 0)), "overnight": (time(20, 0), time(6, 0)), "24h": (time(0, 0), time(0, 0))}
+PHASES = ("parse", "long_format", "slot_events", "timeline", "slot_loop", "csv_output")
+# Phases create_schedule runs; the pandas long format is only timed for reference
+SCHEDULE_PHASES = tuple(p for p in PHASES if p != "long_format")
+FIRST_NAMES = ["Ava", "Ben", "Cara", "Dev", "Eli", "Finn", "Gia", "Hugo", "Iris", "Jay", "Kai", "Lena", "Milo", "Nora",
+               "Owen", "Pia", "Quinn", "Rosa", "Sam", "Tess", "Uri", "Vera", "Wade", "Xena", "Yara", "Zane"]
+
+def _clock(minute):
+    minute %= sl.MINUTES_PER_DAY
+    return f"{(minute // 60) % 12 or 12}:{minute % 60:02d} {'AM' if minute < 720 else 'PM'}"
+
+# Seeded roster in the app's format. Shifts start in staggered waves on the half hour from an hour before
+# opening, run 4-9 hours, get a 30-minute break in their middle third when longer than 5 hours, and about one
+# in ten employees has a ToffTL window. Overnight and 24-hour stores get shifts that cross midnight.
+def generate_roster(n_employees, store_kind="day", seed=0):
+    rng = random.Random(f"{seed}-{store_kind}-{n_employees}")
+    open_t, close_t = STORE_HOURS[store_kind]
+    open_m, close_m = open_t.hour * 60 + open_t.minute, close_t.hour * 60 + close_t.minute
+    span = (close_m - open_m) % sl.MINUTES_PER_DAY or sl.MINUTES_PER_DAY
+    roster = []
+    for i in range(n_employees):
+        length = rng.randrange(8, 19) * 30
+        start = open_m - 60 + rng.randrange(0, max(span - length + 120, 30) // 30) * 30
+        emp = {"Name": f"{FIRST_NAMES[i % len(FIRST_NAMES)]}{i // len(FIRST_NAMES) or ''} {FIRST_NAMES[rng.randrange(len(FIRST_NAMES))]}son",
+               "Shift Start": _clock(start), "Shift End": _clock(start + length), "Break": "", "ToffTL Start": None, "ToffTL End": None}
+        if length > 300: emp["Break"] = _clock(start + length // 3 + rng.randrange(0, length // 90 + 1) * 30)
+        if rng.random() < 0.1:
+            toff_start = start + rng.randrange(1, length // 30 - 1) * 30
+            emp["ToffTL Start"], emp["ToffTL End"] = _clock(toff_start), _clock(toff_start + rng.choice((30, 60, 90)))
+        roster.append(emp)
+    return roster
+
+# One timed pass over every phase; returns ({phase: seconds}, schedule CSV)
+def _run_phases(store_kind, roster, slot_minutes=sl.DEFAULT_SLOT_MINUTES):
+    open_t, close_t = STORE_HOURS[store_kind]; timings = {}
+    t0 = timer.perf_counter(); windows = sl._employee_windows(roster, sl.REF_DATE_FOR_PARSING); timings["parse"] = timer.perf_counter() - t0
+    try:
+        t0 = timer.perf_counter(); sl.preprocess_employee_data_to_long_format(roster, sl.REF_DATE_FOR_PARSING); timings["long_format"] = timer.perf_counter() - t0
+    except ImportError: # pandas/numpy not installed; the core engine does not need them
+        timings["long_format"] = None
+    t0 = timer.perf_counter(); day_start = sl._schedule_start_minute(open_t, close_t, windows, slot_minutes)
+    emp_names, slot_events, shift_spans = sl._slot_events(windows, day_start, slot_minutes); timings["slot_events"] = timer.perf_counter() - t0
+    t0 = timer.perf_counter(); slot_keys, event_keys = sl._slot_timeline(slot_events, shift_spans, slot_minutes); timings["timeline"] = timer.perf_counter() - t0
+    t0 = timer.perf_counter(); rows = list(sl._assign_slots(open_t, close_t, emp_names, slot_events, slot_keys, event_keys, slot_minutes=slot_minutes, day_start_minute=day_start))
+    timings["slot_loop"] = timer.perf_counter() - t0
+    t0 = timer.perf_counter()
+    result = sl.ScheduleResult([k for k in rows[0][1] if k != "Time"]) if rows else None
+    for slot_minute, row_data in rows: result.add_row(slot_minute, row_data)
+    schedule_csv = result.to_csv() if result else ""
+    timings["csv_output"] = timer.perf_counter() - t0
+    return timings, schedule_csv
+
+# Best-of-repeat timings per phase for every (store kind, size) case, after one untimed warm-up pass so
+# imports (pandas for the long format) and first-use tables are not charged to the first case
+def run_benchmarks(sizes=DEFAULT_SIZES, store_kinds=tuple(STORE_HOURS), repeat=3, seed=0, slot_minutes=sl.DEFAULT_SLOT_MINUTES):
+    cases = {}
+    _run_phases(store_kinds[0], generate_roster(5, store_kinds[0], seed), slot_minutes)
+    for store_kind in store_kinds:
+        for n in sizes:
+            roster = generate_roster(n, store_kind, seed)
+            best = {}; schedule_csv = None
+            for _ in range(repeat):
+                timings, schedule_csv = _run_phases(store_kind, roster, slot_minutes)
+                for phase, secs in timings.items():
+                    if secs is not None: best[phase] = min(secs, best.get(phase, secs))
+            open_t, close_t = STORE_HOURS[store_kind]
+            if schedule_csv != (sl.create_schedule(open_t, close_t, roster, slot_minutes=slot_minutes) if schedule_csv else ""):
+                raise AssertionError(f"{store_kind}/{n}: phase-by-phase run and create_schedule disagree")
+            best["total"] = sum(best[p] for p in SCHEDULE_PHASES)
+            case_id = f"{store_kind}/{n}" if slot_minutes == sl.DEFAULT_SLOT_MINUTES else f"{store_kind}/{n}@{slot_minutes}m"
+            cases[case_id] = {"store_kind": store_kind, "employees": n, "seconds": best,
+                                          "schedule_sha256": hashlib.sha256(schedule_csv.encode("utf-8")).hexdigest()}
+    return {"seed": seed, "repeat": repeat, "python": platform.python_version(), "cases": cases}
+
+# Lists regressions (phase slower than baseline by more than threshold, ignoring phases under min_seconds in
+# both runs) and golden-output mismatches for the cases present in both runs
+def compare_results(current, baseline, threshold=0.25, min_seconds=0.005):
+    problems = []
+    for case_id, case in current["cases"].items():
+        base = baseline["cases"].get(case_id)
+        if base is None: continue
+        if case["schedule_sha256"] != base["schedule_sha256"]:
+            problems.append(f"{case_id}: schedule output differs from baseline")
+        for phase, secs in case["seconds"].items():
+            base_secs = base["seconds"].get(phase)
+            if base_secs is None or max(secs, base_secs) < min_seconds: continue
+            if secs > base_secs * (1 + threshold):
+                problems.append(f"{case_id}: {phase} {base_secs * 1000:.2f} ms -> {secs * 1000:.2f} ms (+{(secs / base_secs - 1) * 100:.0f}%)")
+    return problems
+
+def _print_table(results, out=sys.stdout):
+    out.write(f"{'case':<16}" + "".join(f"{p:>14}" for p in PHASES + ("total",)) + "\n")
+    for case_id, case in results["cases"].items():
+        cells = [case["seconds"].get(p) for p in PHASES + ("total",)]
+        out.write(f"{case_id:<16}" + "".join(f"{'-':>14}" if c is None else f"{c * 1000:>11.2f} ms" for c in cells) + "\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark create_schedule phase by phase on synthetic rosters.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="roster sizes (employees)")
+    parser.add_argument("--stores", nargs="+", choices=list(STORE_HOURS), default=list(STORE_HOURS), help="store kinds")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0, help="roster generator seed")
+    parser.add_argument("--slot-minutes", type=int, choices=sl.SLOT_MINUTES_CHOICES, default=sl.DEFAULT_SLOT_MINUTES, help="schedule row length")
+    parser.add_argument("-o", "--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run to check against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before a phase is flagged (0.25 = 25%%)")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore phases faster than this in both runs (timer noise)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.stores, args.repeat, args.seed, args.slot_minutes)
+    _print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: baseline = json.load(f)
+        if baseline.get("seed") != results["seed"]: print("warning: baseline was generated with a different seed", file=sys.stderr)
+        problems = compare_results(results, baseline, args.threshold, args.min_ms / 1000)
+        for problem in problems: print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems: return 1
+        print("No regressions against baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# File: scheduler_cli.py
+# Headless entry point: reads rosters from CSV/JSON files (one file or a whole directory) and writes schedules.
+#
+#   python scheduler_cli.py roster.csv --open "6:00 AM" --close "10:00 PM" -o schedule.csv
+#   python scheduler_cli.py rosters/ --open 06:00 --close 22:00 -o schedules/ --workers 4
+#   python scheduler_cli.py roster.json --slot-minutes 15
+#   python scheduler_cli.py roster.csv --open 06:00 --close 22:00 --optimize-breaks --time-budget 30 --roster-output best.json
+#
+# A CSV roster has one row per employee with the app's field names as headers
+# (Name, Shift Start, Shift End, Break, ToffTL Start, ToffTL End). A JSON roster is either a list of such
+# objects or {"store_open": ..., "store_close": ..., "employees": [...]}, whose store hours override --open/--close.
+# Only the standard library and scheduler_logic are imported on the common path, so start-up stays fast.
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+
+from scheduler_logic import create_schedule, parse_time_input, DEFAULT_SLOT_MINUTES, NO_SLOTS_MESSAGE, SLOT_MINUTES_CHOICES
+
+ROSTER_EXTENSIONS = (".csv", ".json")
+REF_DATE_FOR_PARSING = datetime(1970, 1, 1).date()
+
+def _store_time(time_str, what):
+    if not time_str: raise ValueError(f"store {what} time missing (set --{what} or it in the JSON roster)")
+    parsed = parse_time_input(time_str, REF_DATE_FOR_PARSING)
+    if parsed is None: raise ValueError(f"invalid store {what} time {time_str!r}")
+    return parsed.time()
+
+# Returns (store_open, store_close, employee_data_list); store hours are None unless the file sets them
+def load_roster(path):
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f: data = json.load(f)
+        if isinstance(data, dict): return data.get("store_open"), data.get("store_close"), data.get("employees", [])
+        return None, None, data
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return None, None, [row for row in csv.DictReader(f) if (row.get("Name") or "").strip()]
+
+def _roster_paths(input_path):
+    if os.path.isdir(input_path):
+        return sorted(os.path.join(input_path, n) for n in os.listdir(input_path) if n.lower().endswith(ROSTER_EXTENSIONS))
+    return [input_path]
+
+def _output_path(roster_path, output, many, extension=".csv"):
+    if not output or output == "-": return None
+    if many or os.path.isdir(output):
+        return os.path.join(output, os.path.splitext(os.path.basename(roster_path))[0] + extension)
+    return output
+
+def _run_serial(job):
+    try: return job[0], create_schedule(*job[1:4], slot_minutes=job[4]), None
+    except Exception as e: return job[0], None, f"{type(e).__name__}: {e}"
+
+# Searches the roster's break times first (see scheduler_optimizer), reports the score change on stderr and
+# optionally writes the optimized roster as a JSON roster file
+def _run_optimized(job, args, many):
+    from scheduler_optimizer import optimize_breaks
+    path, store_open, store_close, employees, slot_minutes = job
+    try: found = optimize_breaks(store_open, store_close, employees, time_budget=args.time_budget, max_workers=args.workers, slot_minutes=slot_minutes)
+    except Exception as e: return path, None, f"{type(e).__name__}: {e}"
+    base, best = found.baseline_score, found.score
+    print(f"{path}: breaks optimized, uncovered {base.uncovered} -> {best.uncovered}, pair breaks {base.pair_breaks} -> {best.pair_breaks} "
+          f"({found.candidates_scored} candidates{'' if found.converged else ', time budget reached'})", file=sys.stderr)
+    roster_path = _output_path(path, args.roster_output, many, ".json")
+    if roster_path:
+        with open(roster_path, "w", encoding="utf-8") as f:
+            json.dump({"store_open": store_open.strftime("%H:%M"), "store_close": store_close.strftime("%H:%M"), "employees": found.employee_data_list}, f, indent=2)
+    return path, found.schedule.to_csv() if found.schedule else NO_SLOTS_MESSAGE, None
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Generate employee schedules from roster files.")
+    parser.add_argument("input", help="roster file (.csv/.json) or a directory of roster files")
+    parser.add_argument("--open", dest="store_open", help="store open time, e.g. '6:00 AM' or 06:00")
+    parser.add_argument("--close", dest="store_close", help="store close time, e.g. '10:00 PM' or 22:00")
+    parser.add_argument("-o", "--output", help="output file, or directory for several rosters (default: stdout)")
+    parser.add_argument("--workers", type=int, help="schedule a directory of rosters on this many processes (with --optimize-breaks: score candidates on this many, default all cores)")
+    parser.add_argument("--slot-minutes", type=int, choices=SLOT_MINUTES_CHOICES, default=DEFAULT_SLOT_MINUTES, help="schedule row length in minutes")
+    parser.add_argument("--optimize-breaks", action="store_true", help="move break times to minimize uncovered priority positions and pair breaks")
+    parser.add_argument("--time-budget", type=float, default=10.0, help="seconds the break search may take per roster")
+    parser.add_argument("--roster-output", help="with --optimize-breaks: write the optimized roster(s) as JSON to this file or directory")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    roster_paths = _roster_paths(args.input)
+    if not roster_paths:
+        print(f"No roster files found in {args.input}", file=sys.stderr); return 1
+    many = len(roster_paths) > 1
+    if many and args.output and args.output != "-": os.makedirs(args.output, exist_ok=True)
+    if many and args.roster_output: os.makedirs(args.roster_output, exist_ok=True)
+
+    failed = 0; jobs = []
+    for path in roster_paths:
+        try:
+            store_open, store_close, employees = load_roster(path)
+            jobs.append((path, _store_time(store_open or args.store_open, "open"), _store_time(store_close or args.store_close, "close"), employees, args.slot_minutes))
+        except (OSError, ValueError) as e:
+            print(f"{path}: {e}", file=sys.stderr); failed += 1
+
+    if args.optimize_breaks:
+        results = (_run_optimized(job, args, many) for job in jobs)
+    elif args.workers and args.workers > 1 and len(jobs) > 1:
+        from scheduler_batch import run_schedule_batch
+        results = run_schedule_batch(jobs, max_workers=args.workers)
+    else:
+        results = map(_run_serial, jobs)
+
+    for path, schedule_csv, error in results:
+        if error:
+            print(f"{path}: {error}", file=sys.stderr); failed += 1; continue
+        if schedule_csv == NO_SLOTS_MESSAGE:
+            print(f"{path}: {schedule_csv}", file=sys.stderr); continue
+        out_path = _output_path(path, args.output, many)
+        if out_path is None:
+            if many: sys.stdout.write(f"# {path}\n")
+            sys.stdout.write(schedule_csv)
+        else:
+            with open(out_path, "w", newline="", encoding="utf-8") as f: f.write(schedule_csv)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
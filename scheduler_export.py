@@ -0,0 +1,72 @@
+# File: scheduler_export.py
+# Typed columnar exports of a ScheduleResult for downstream analytics, so consumers do not have to parse
+# the CSV grid back. Two tables are produced:
+#   wide: one row per slot  -> slot_start (timestamp), time (label), one column per position
+#   long: one row per (slot, position, employee) assignment -> slot_start, time, position, employee
+# Parquet or Arrow IPC are written when pyarrow is installed; newline-delimited JSON otherwise.
+import json
+
+COLUMNAR_FORMATS = ("parquet", "arrow", "jsonl")
+FILE_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow", "jsonl": ".jsonl"}
+MIME_TYPES = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.file", "jsonl": "application/x-ndjson"}
+
+def _pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        return None
+
+# Best format available here: Parquet with pyarrow, JSON lines without it
+def default_columnar_format():
+    return "parquet" if _pyarrow() is not None else "jsonl"
+
+# Employees in one cell: the result's name list for Break/ToffTL, the single name (if any) of a work position
+def _cell_employees(result, pos, i):
+    if pos in result.members: return result.members[pos][i]
+    cell = result.assignments[pos][i]
+    return [cell] if cell else []
+
+# Column-oriented wide and long tables as plain Python lists
+def schedule_tables(result, schedule_date=None):
+    slot_starts = result.slot_timestamps(schedule_date)
+    wide = {"slot_start": slot_starts, "time": list(result.times)}
+    for pos in result.positions: wide[pos] = [cell or None for cell in result.assignments[pos]]
+    long = {"slot_start": [], "time": [], "position": [], "employee": []}
+    for i, slot_start in enumerate(slot_starts):
+        for pos in result.positions:
+            for name in _cell_employees(result, pos, i):
+                long["slot_start"].append(slot_start); long["time"].append(result.times[i])
+                long["position"].append(pos); long["employee"].append(name)
+    return {"wide": wide, "long": long}
+
+def _jsonl_bytes(columns):
+    names = list(columns); lines = []
+    for values in zip(*columns.values()):
+        record = {n: (v.isoformat() if n == "slot_start" else v) for n, v in zip(names, values)}
+        lines.append(json.dumps(record) + "\n")
+    return "".join(lines).encode("utf-8")
+
+def _arrow_table(pa, columns):
+    fields = [pa.field("slot_start", pa.timestamp("s"))] + [pa.field(n, pa.string()) for n in columns if n != "slot_start"]
+    return pa.table(columns, schema=pa.schema(fields))
+
+# Serializes both tables; returns {"wide": bytes, "long": bytes}. fmt defaults to default_columnar_format().
+def export_schedule(result, fmt=None, schedule_date=None):
+    fmt = fmt or default_columnar_format()
+    if fmt not in COLUMNAR_FORMATS: raise ValueError(f"Unknown export format {fmt!r}; expected one of {COLUMNAR_FORMATS}")
+    tables = schedule_tables(result, schedule_date)
+    if fmt == "jsonl": return {name: _jsonl_bytes(cols) for name, cols in tables.items()}
+
+    pa = _pyarrow()
+    if pa is None: raise ImportError(f"pyarrow is required for {fmt} export; use 'jsonl' instead")
+    exported = {}
+    for name, cols in tables.items():
+        table = _arrow_table(pa, cols); sink = pa.BufferOutputStream()
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, sink)
+        else:
+            with pa.ipc.new_file(sink, table.schema) as writer: writer.write_table(table)
+        exported[name] = sink.getvalue().to_pybytes()
+    return exported
@@ -1,313 +1,765 @@
 # File: scheduler_logic.py
-import pandas as pd
+# The scheduling core only needs time arithmetic and dicts, so it imports neither pandas nor numpy at load
+# time: pandas is pulled in lazily for unusual time inputs and for the DataFrame long-format helper.
+import csv
+import heapq
+import os
+import re
+import sys
 from io import StringIO
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from time import perf_counter
 
 # STORE_OPEN_TIME and STORE_CLOSE_TIME will now be passed as arguments
 # to the main function.
 
-# Helper function to parse time strings
-def parse_time_input(time_val, ref_date_for_parsing):
-    if pd.isna(time_val) or str(time_val).strip().upper() == 'N/A' or str(time_val).strip() == '':
-        return pd.NaT
+# Fast path for the two formats the app asks for ("9:30 PM"/"09:30PM" and "21:30").
+# Anything else goes through the pandas parser below.
+_CLOCK_TIME_RE = re.compile(r'^(\d{1,2}):(\d{2})(?: ?([AP])M)?$')
+TIME_PARSE_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=TIME_PARSE_CACHE_SIZE)
+def _parse_clock_time(normalized_time_str):
+    m = _CLOCK_TIME_RE.match(normalized_time_str)
+    if not m: return None
+    hour, minute, meridiem = int(m.group(1)), int(m.group(2)), m.group(3)
+    if minute > 59: return None
+    if meridiem:
+        if not 1 <= hour <= 12: return None
+        hour = hour % 12 + (12 if meridiem == 'P' else 0)
+    elif hour > 23: return None
+    return time(hour, minute)
+
+# Original pandas-based parsing, kept for unusual inputs ("9 AM", "1:00 p.m.", "09:00:00", ...)
+@lru_cache(maxsize=TIME_PARSE_CACHE_SIZE)
+def _parse_time_with_pandas(time_str, ref_date_for_parsing):
+    import pandas as pd
     try:
         # Attempt to parse as datetime with a reference date
-        dt_obj = pd.to_datetime(f"{ref_date_for_parsing.strftime('%Y-%m-%d')} {str(time_val).strip()}")
-        return dt_obj
+        return pd.to_datetime(f"{ref_date_for_parsing.strftime('%Y-%m-%d')} {time_str}")
     except ValueError:
         try:
             # Fallback: attempt to parse as time only and combine with reference date
-            time_obj = pd.to_datetime(str(time_val).strip()).time()
+            time_obj = pd.to_datetime(time_str).time()
             return datetime.combine(ref_date_for_parsing, time_obj)
         except ValueError:
-            return pd.NaT # Return NaT if all parsing attempts fail
+            return None # Return None if all parsing attempts fail
 
-# Preprocessing function adapted to take a list of employee data dictionaries
-def preprocess_employee_data_to_long_format(employee_data_list, ref_date_for_parsing):
-    all_employee_slots = []
-    activity_definitions = {"ToffTL": ("ToffTL Start", "ToffTL End")}
+# None/NaN, plus pandas' NaT/NA when the caller already works with pandas objects
+def _is_missing(val):
+    if val is None: return True
+    if isinstance(val, float): return val != val
+    if isinstance(val, str): return False
+    pd = sys.modules.get('pandas')
+    return pd is not None and pd.api.types.is_scalar(val) and bool(pd.isna(val))
+
+# Helper function to parse time strings. Returns a datetime on the reference date, or None.
+def parse_time_input(time_val, ref_date_for_parsing):
+    if _is_missing(time_val): return None
+    time_str = str(time_val).strip()
+    if time_str == '' or time_str.upper() == 'N/A': return None
+    clock_time = _parse_clock_time(' '.join(time_str.upper().split()))
+    if clock_time is not None: return datetime.combine(ref_date_for_parsing, clock_time)
+    return _parse_time_with_pandas(time_str, ref_date_for_parsing)
+
+REF_DATE_FOR_PARSING = datetime(1970, 1, 1).date() # Consistent ref date
+SLOT_SECONDS = 30 * 60          # slot length of the long format and create_schedule's default
+DEFAULT_SLOT_MINUTES = SLOT_SECONDS // 60
+SLOT_MINUTES_CHOICES = (5, 10, 15, 30)
+ROTATION_MINUTES = 30           # stations rotate every half hour whatever the slot length
+BREAK_SECONDS = 30 * 60         # unpaid break length
+MINUTES_PER_DAY = 24 * 60
+NO_SLOTS_MESSAGE = "No employee slots generated from input." # create_schedule's result when no shift yields a slot
+LONG_FORMAT_COLUMNS = ['Time', 'EmployeeNameFML', 'Position Scheduled As', 'Unpaid Break']
+GROUP_COLUMNS = ("Break", "ToffTL") # output columns that hold every employee in the state, comma-joined
+
+# Display label for every minute of the day ("9:30 PM"), built on first use.
+_SLOT_LABELS_BY_MINUTE = None
+
+def _slot_labels_by_minute():
+    global _SLOT_LABELS_BY_MINUTE
+    if _SLOT_LABELS_BY_MINUTE is None:
+        _SLOT_LABELS_BY_MINUTE = [f"{(m // 60) % 12 or 12}:{m % 60:02d} {'AM' if m < 720 else 'PM'}" for m in range(MINUTES_PER_DAY)]
+    return _SLOT_LABELS_BY_MINUTE
+
+# Whole seconds since the reference midnight, or None
+def _seconds_from_ref(dt_val, ref_midnight):
+    if dt_val is None: return None
+    return int((dt_val.replace(tzinfo=None) - ref_midnight).total_seconds())
 
+# (start, end) seconds for a window, rolling the end over midnight like the shift/ToffTL parsing does
+def _window_seconds(start_val, end_val, ref_midnight):
+    s, e = _seconds_from_ref(start_val, ref_midnight), _seconds_from_ref(end_val, ref_midnight)
+    if s is not None and e is not None and e < s: e += 24 * 3600
+    return s, e
+
+# Parses each roster entry into (display name, shift start/end, ToffTL start/end, break start/end), all in whole
+# seconds since the reference midnight. Entries without a usable shift are skipped.
+def _employee_windows(employee_data_list, ref_date_for_parsing):
+    ref_midnight = datetime.combine(ref_date_for_parsing, time())
+    windows = []
     for emp_data in employee_data_list:
         name_str = emp_data.get('Name', '')
         first_name, last_name_part = (name_str.split(" ", 1) + [""])[:2] if " " in name_str else (name_str, "")
         emp_name_fml = f"{first_name} {last_name_part[0] + '.' if last_name_part else ''}".strip()
 
-        shift_start_dt = parse_time_input(emp_data.get('Shift Start'), ref_date_for_parsing)
-        shift_end_dt = parse_time_input(emp_data.get('Shift End'), ref_date_for_parsing)
-        if pd.notna(shift_start_dt) and pd.notna(shift_end_dt) and shift_end_dt < shift_start_dt:
-            shift_end_dt += pd.Timedelta(days=1)
-        
-        activity_times = {}
-        for internal_key, (start_col_key, end_col_key) in activity_definitions.items():
-            s_dt = parse_time_input(emp_data.get(start_col_key), ref_date_for_parsing)
-            e_dt = parse_time_input(emp_data.get(end_col_key), ref_date_for_parsing)
-            if pd.notna(s_dt) and pd.notna(e_dt) and e_dt < s_dt: e_dt += pd.Timedelta(days=1)
-            activity_times[internal_key] = (s_dt, e_dt)
-        
-        unpaid_break_start_dt = parse_time_input(emp_data.get('Break'), ref_date_for_parsing)
-        unpaid_break_end_dt = None
-        if pd.notna(unpaid_break_start_dt):
-            unpaid_break_end_dt = unpaid_break_start_dt + pd.Timedelta(minutes=30)
-
-        if pd.notna(shift_start_dt) and pd.notna(shift_end_dt):
-            current_time_slot_start = shift_start_dt
-            while current_time_slot_start < shift_end_dt:
-                slot_time_str = current_time_slot_start.strftime('%I:%M %p').lstrip('0')
-                position_scheduled_as = "Available" 
-                is_unpaid_break_str = "FALSE" 
-
-                if pd.notna(activity_times['ToffTL'][0]) and pd.notna(activity_times['ToffTL'][1]) and \
-                activity_times['ToffTL'][0] <= current_time_slot_start < activity_times['ToffTL'][1]:
-                    position_scheduled_as = "ToffTL"
-                
-                if pd.notna(unpaid_break_start_dt) and pd.notna(unpaid_break_end_dt) and \
-                unpaid_break_start_dt <= current_time_slot_start < unpaid_break_end_dt:
-                    is_unpaid_break_str = "TRUE"
-
-                all_employee_slots.append({
-                    'Time': slot_time_str, 'EmployeeNameFML': emp_name_fml,
-                    'Position Scheduled As': position_scheduled_as, 'Unpaid Break': is_unpaid_break_str 
-                })
-                current_time_slot_start += pd.Timedelta(minutes=30)
-    
-    return pd.DataFrame(all_employee_slots, columns=['Time','EmployeeNameFML','Position Scheduled As','Unpaid Break']) if all_employee_slots else \
-        pd.DataFrame(columns=['Time','EmployeeNameFML','Position Scheduled As','Unpaid Break'])
-
-# This is the main function Streamlit will call
-def create_schedule(store_open_time_obj, store_close_time_obj, employee_data_list):
+        s_sec, e_sec = _window_seconds(parse_time_input(emp_data.get('Shift Start'), ref_date_for_parsing),
+                                       parse_time_input(emp_data.get('Shift End'), ref_date_for_parsing), ref_midnight)
+        if s_sec is None or e_sec is None: continue
+        t_s, t_e = _window_seconds(parse_time_input(emp_data.get('ToffTL Start'), ref_date_for_parsing),
+                                   parse_time_input(emp_data.get('ToffTL End'), ref_date_for_parsing), ref_midnight)
+        b_s = _seconds_from_ref(parse_time_input(emp_data.get('Break'), ref_date_for_parsing), ref_midnight)
+
+        # Missing ToffTL/break windows become the empty range [0, 0) so they never match a slot.
+        # Windows that are over by the time the shift starts belong to the shift's next day (overnight shifts);
+        # one that starts a little before the shift still covers its first slots.
+        if t_s is None or t_e is None: t_s = t_e = 0
+        elif t_e <= s_sec: t_s += 24 * 3600; t_e += 24 * 3600
+        if b_s is not None and b_s + BREAK_SECONDS <= s_sec: b_s += 24 * 3600
+        b_e = b_s + BREAK_SECONDS if b_s is not None else 0
+        windows.append((emp_name_fml, s_sec, e_sec, t_s, t_e, b_s or 0, b_e))
+    return windows
+
+# Expands every employee's shift to 30-minute slots in one batched NumPy pass.
+# Returns columnar arrays: absolute slot start (minutes since the reference midnight),
+# the employee's display name and the ToffTL/break flags for each slot.
+def _expand_employee_slots(windows):
+    import numpy as np
+    names, shift_s, shift_e, toff_s, toff_e, brk_s, brk_e = (list(col) for col in zip(*windows)) if windows else ([],) * 7
+    shift_s, shift_e = np.asarray(shift_s, dtype=np.int64), np.asarray(shift_e, dtype=np.int64)
+    # Same count as stepping 30 minutes from the shift start while still before the shift end
+    n_slots = np.maximum((shift_e - shift_s + SLOT_SECONDS - 1) // SLOT_SECONDS, 0)
+    total = int(n_slots.sum())
+
+    emp_idx = np.repeat(np.arange(len(names)), n_slots)
+    first_row = np.cumsum(n_slots) - n_slots
+    slot_start = shift_s[emp_idx] + (np.arange(total) - first_row[emp_idx]) * SLOT_SECONDS
+
+    return {
+        'minute': slot_start // 60,
+        'name': np.asarray(names, dtype=object)[emp_idx],
+        'is_tofftl': (np.asarray(toff_s, dtype=np.int64)[emp_idx] <= slot_start) & (slot_start < np.asarray(toff_e, dtype=np.int64)[emp_idx]),
+        'is_break': (np.asarray(brk_s, dtype=np.int64)[emp_idx] <= slot_start) & (slot_start < np.asarray(brk_e, dtype=np.int64)[emp_idx]),
+    }
+
+# Preprocessing function adapted to take a list of employee data dictionaries (returns a pandas DataFrame)
+def preprocess_employee_data_to_long_format(employee_data_list, ref_date_for_parsing):
+    import numpy as np
+    import pandas as pd
+    slots = _expand_employee_slots(_employee_windows(employee_data_list, ref_date_for_parsing))
+    if not len(slots['minute']): return pd.DataFrame(columns=LONG_FORMAT_COLUMNS)
+    return pd.DataFrame({
+        'Time': np.asarray(_slot_labels_by_minute(), dtype=object)[slots['minute'] % MINUTES_PER_DAY],
+        'EmployeeNameFML': slots['name'],
+        'Position Scheduled As': np.where(slots['is_tofftl'], "ToffTL", "Available").astype(object),
+        'Unpaid Break': np.where(slots['is_break'], "TRUE", "FALSE").astype(object),
+    }, columns=LONG_FORMAT_COLUMNS)
+
+# Minute the schedule starts at, from midnight of the store's day: the middle of the store's closed period, so
+# pre-open and post-close shifts stay on the store's own day. A 24-hour store (open == close) starts at opening
+# time. Given the parsed windows, a start that some shift runs across moves to the nearest minute of the
+# longest stretch no shift runs across (which can be the evening before, a negative minute), so no shift is cut
+# in two and people on shift together share their slots. If shifts run across every minute, the start stays
+# and _slot_events wraps the shifts that cross it.
+def _schedule_start_minute(store_open_time_obj, store_close_time_obj, windows=None, slot_minutes=DEFAULT_SLOT_MINUTES):
+    open_m = store_open_time_obj.hour * 60 + store_open_time_obj.minute
+    close_m = store_close_time_obj.hour * 60 + store_close_time_obj.minute
+    start = (close_m + ((open_m - close_m) % MINUTES_PER_DAY) // 2) % MINUTES_PER_DAY
+    if not windows: return start
+    # Each shift as (first minute of the day, minutes up to the end of its last slot)
+    step = slot_minutes * 60
+    shifts = [((s_sec // 60) % MINUTES_PER_DAY, -(-(e_sec - s_sec) // step) * slot_minutes) for _, s_sec, e_sec, *_ in windows]
+    if not any(0 < (start - first) % MINUTES_PER_DAY < length for first, length in shifts): return start
+
+    # crossing[m] (after the running sum): shifts that started before minute m and are still on after it
+    crossing = [0] * (2 * MINUTES_PER_DAY + 1)
+    for first, length in shifts:
+        if length > 1: crossing[first + 1] += 1; crossing[first + length] -= 1
+    depth = 0; free = []
+    for m in range(2 * MINUTES_PER_DAY):
+        depth += crossing[m]
+        if m < MINUTES_PER_DAY: free.append(depth == 0)
+        elif depth: free[m - MINUTES_PER_DAY] = False # the part of a shift past midnight
+    if not any(free): return start
+    # Runs of free minutes, scanned from a taken minute so a run across midnight stays in one piece
+    runs = []; run = []; first_taken = free.index(False)
+    for m in range(first_taken, first_taken + MINUTES_PER_DAY):
+        if free[m % MINUTES_PER_DAY]: run.append(m % MINUTES_PER_DAY)
+        elif run: runs.append(run); run = []
+    if run: runs.append(run)
+    back, ahead = min((((start - m) % MINUTES_PER_DAY, (m - start) % MINUTES_PER_DAY) for m in max(runs, key=len)), key=min)
+    return start - back if back <= ahead else start + ahead
+
+# Candidate index shared by the LRU selection sites in create_schedule. Each position keeps a min-heap of
+# (last time at position, employee id, generation) over the employees available for work; ids follow name
+# order, so ties still go to the first name. Entries are dropped lazily once the employee's last time at the
+# position has moved on, or once they left the available pool (which bumps their generation). Employees only
+# ineligible for the current slot are parked and pushed back by end_slot(), so best() returns the same
+# (last time, name) minimum as a full scan of the pool.
+class _PositionCandidateIndex:
+    def __init__(self, n_positions, emp_last_time_spec_pos, n_emps):
+        self.n_positions = n_positions
+        self.heaps = [[] for _ in range(n_positions)]
+        self.parked = [[] for _ in range(n_positions)]
+        self.last_time = emp_last_time_spec_pos  # flat: [emp * n_positions + pos]
+        self.generation = [0] * n_emps
+        self.available = set()
+        self.queries = self.stale_entries = 0  # best() calls and outdated heap entries dropped, for ScheduleStats
+
+    def start_slot(self, avail_emps):
+        avail_now = set(avail_emps)
+        for emp in self.available - avail_now: self.generation[emp] += 1
+        for emp in avail_now - self.available:
+            self.generation[emp] += 1; gen = self.generation[emp]; base = emp * self.n_positions
+            for pos, heap in enumerate(self.heaps): heapq.heappush(heap, (self.last_time[base + pos], emp, gen))
+        self.available = avail_now
+
+    # Call after emp_last_time_spec_pos has been updated for (emp, pos)
+    def record(self, emp, pos, time_step):
+        if emp in self.available: heapq.heappush(self.heaps[pos], (time_step, emp, self.generation[emp]))
+
+    def best(self, pos, is_eligible):
+        heap, parked, last_time, n_positions = self.heaps[pos], self.parked[pos], self.last_time, self.n_positions; self.queries += 1
+        while heap:
+            lt, emp, gen = heap[0]
+            if gen != self.generation[emp] or lt != last_time[emp * n_positions + pos]: heapq.heappop(heap); self.stale_entries += 1
+            elif not is_eligible(emp): parked.append(heapq.heappop(heap))
+            else: return emp
+        return None
+
+    def end_slot(self):
+        for pos, parked in enumerate(self.parked):
+            for entry in parked: heapq.heappush(self.heaps[pos], entry)
+            parked.clear()
+
+# Diagnostics for one scheduling run: wall-clock seconds per phase (parse, expand, time_map, slot_loop, export)
+# and counters from the slot loop. The slot loop's time excludes time spent by the caller between streamed rows.
+# The counters cover the whole day even when the run resumed from checkpoints (the replayed slots bring their
+# counts along) and match a fresh run's, except resumed_slots (slots replayed by this run) and
+# stale_heap_entries (the resumed run rebuilds its candidate heaps).
+# on_phase, if given, is called as on_phase(phase, seconds) when each phase finishes, e.g. to log it.
+class ScheduleStats:
+    PHASES = ("parse", "expand", "time_map", "slot_loop", "export")
+
+    def __init__(self, on_phase=None):
+        self.phase_seconds = {}
+        self.counters = {}
+        self.on_phase = on_phase
+
+    def record_phase(self, phase, seconds):
+        if phase not in self.PHASES: raise ValueError(f"Unknown phase {phase!r}; expected one of {self.PHASES}")
+        self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+        if self.on_phase is not None: self.on_phase(phase, seconds)
+
+    # Records the time since started (a perf_counter() value) under phase and returns the current perf_counter()
+    def lap(self, phase, started):
+        now = perf_counter(); self.record_phase(phase, now - started)
+        return now
+
+    @property
+    def total_seconds(self):
+        return sum(self.phase_seconds.values())
+
+# Carried engine state saved at every slot boundary of the last create_schedule run. A later run whose slot
+# inputs match up to some slot resumes from the snapshot there and reuses the rows before it, so editing one
+# employee's break only recomputes the day from the first slot the edit touches. Keep one instance per editing
+# session and pass it as create_schedule(..., checkpoints=...).
+class ScheduleCheckpoints:
+    def __init__(self):
+        self.run_signature = None  # (schedule start minute, store open/close seconds, slot minutes) of the saved run
+        self.slot_signatures = []  # per slot: (slot key, roster rows active in the slot)
+        self.snapshots = []        # per slot boundary: carried state before the slot, plus one after the last slot
+        self.rows = []             # per slot: (slot minute, output row)
+        self.slot_counters = []    # per slot boundary: the slot loop's counters before the slot
+
+# Copy of the state carried from one slot to the next, with the employee names its ids refer to
+def _snapshot_slot_state(emp_names, emp_lb_last, emp_cur_pos, emp_time_cur_pos, emp_last_time_spec_pos, paired_position_defs, g_time_step):
+    return (emp_names, emp_lb_last[:], emp_cur_pos[:], emp_time_cur_pos[:], emp_last_time_spec_pos[:],
+            {pid: dict(pdef) for pid, pdef in paired_position_defs.items()}, g_time_step)
+
+# Copies a snapshot back into the live state lists (in place, the candidate index shares emp_last_time_spec_pos).
+# A snapshot taken with other employee names is re-indexed by name. Returns the snapshot's g_time_step.
+def _restore_slot_state(snapshot, emp_names, emp_lb_last, emp_cur_pos, emp_time_cur_pos, emp_last_time_spec_pos, paired_position_defs):
+    saved_names, lb_last, cur_pos, time_cur_pos, last_time_spec_pos, pairs, g_time_step = snapshot
+    if saved_names == emp_names:
+        emp_lb_last[:] = lb_last; emp_cur_pos[:] = cur_pos; emp_time_cur_pos[:] = time_cur_pos; emp_last_time_spec_pos[:] = last_time_spec_pos
+        paired_position_defs.update({pid: dict(pdef) for pid, pdef in pairs.items()})
+        return g_time_step
+    n_emps, n_positions = len(emp_names), len(emp_last_time_spec_pos) // len(emp_names)
+    emp_id = {name: i for i, name in enumerate(emp_names)}
+    emp_lb_last[:] = [False] * n_emps; emp_cur_pos[:] = [NO_POSITION] * n_emps; emp_time_cur_pos[:] = [0] * n_emps
+    emp_last_time_spec_pos[:] = [-1] * (n_emps * n_positions)
+    for saved_id, name in enumerate(saved_names):
+        emp = emp_id.get(name)
+        if emp is None: continue
+        emp_lb_last[emp] = lb_last[saved_id]; emp_cur_pos[emp] = cur_pos[saved_id]; emp_time_cur_pos[emp] = time_cur_pos[saved_id]
+        emp_last_time_spec_pos[emp * n_positions:(emp + 1) * n_positions] = last_time_spec_pos[saved_id * n_positions:(saved_id + 1) * n_positions]
+    for pid, pdef in pairs.items():
+        paired_position_defs[pid] = dict(pdef, emps=tuple(None if e is None else emp_id.get(saved_names[e]) for e in pdef["emps"]))
+    return g_time_step
+
+# Employee state in a slot: working, on unpaid break (which wins over ToffTL) or ToffTL
+ON_FLOOR, ON_BREAK, ON_TOFFTL = 0, 1, 2
+NO_POSITION = -1
+
+# Sweep input. Employees are interned as ids in name order, with id 0 reserved for the empty name, which also
+# stands for an open position (so an unnamed employee is handled like an empty cell, as with name strings).
+# Instead of one entry per employee and slot, every employee contributes events at the slots where their state
+# changes: (roster index, (employee id, state)) at shift start and at break/ToffTL edges, and (roster index,
+# None) once the shift is over. Employees stay on the grid of slot_minutes steps from their own shift start.
+# A slot's key is its clock minute counted from the schedule's start (see _schedule_start_minute), so slots at
+# the same clock time share a key and overnight slots sort after the evening ones. A shift running across the
+# start wraps: its slots from there on continue at the start of the schedule, as a second span.
+# Returns (names by id, {slot key: events}, {grid: [(first, end) slot keys]}).
+def _slot_events(windows, day_start_minute, slot_minutes=DEFAULT_SLOT_MINUTES):
+    emp_names = ("",) + tuple(sorted({w[0] for w in windows} - {""}))
+    emp_id = {name: i for i, name in enumerate(emp_names)}
+    step = slot_minutes * 60; slot_events = {}; shift_spans = {}
+    for idx, (name, s_sec, e_sec, t_s, t_e, b_s, b_e) in enumerate(windows):
+        n_slots = -(-(e_sec - s_sec) // step)
+        if n_slots <= 0: continue
+        first_key = (s_sec // 60 - day_start_minute) % MINUTES_PER_DAY
+        wrap = min(-(-(MINUTES_PER_DAY - first_key) // slot_minutes), n_slots) # index of the first slot past the day's end
+        # Index of the employee's first slot starting at or after sec, within the shift
+        first_slot_from = lambda sec: min(max(-(-(sec - s_sec) // step), 0), n_slots)
+        state = None
+        for i in sorted({0, wrap, first_slot_from(t_s), first_slot_from(t_e), first_slot_from(b_s), first_slot_from(b_e)} - {n_slots}):
+            slot_sec = s_sec + i * step
+            slot_state = ON_BREAK if b_s <= slot_sec < b_e else ON_TOFFTL if t_s <= slot_sec < t_e else ON_FLOOR
+            if slot_state == state and i != wrap: continue
+            state = slot_state
+            slot_events.setdefault(first_key + i * slot_minutes - (MINUTES_PER_DAY if i >= wrap else 0), []).append((idx, (emp_id[name], state)))
+        end_key = first_key + n_slots * slot_minutes
+        if wrap < n_slots: # the wrapped part ends before (or, for a full day, exactly where) the first part starts
+            if end_key - MINUTES_PER_DAY < first_key: slot_events.setdefault(end_key - MINUTES_PER_DAY, []).append((idx, None))
+            shift_spans.setdefault(first_key % slot_minutes, []).append((first_key + wrap * slot_minutes - MINUTES_PER_DAY, end_key - MINUTES_PER_DAY))
+            end_key = first_key + wrap * slot_minutes
+        slot_events.setdefault(end_key, []).append((idx, None))
+        shift_spans.setdefault(first_key % slot_minutes, []).append((first_key, end_key))
+    return emp_names, slot_events, shift_spans
+
+# Every slot key someone is on shift for (the union of the shift spans on each grid) and the event keys, in order
+def _slot_timeline(slot_events, shift_spans, slot_minutes=DEFAULT_SLOT_MINUTES):
+    slot_keys = []
+    for spans in shift_spans.values():
+        spans.sort(); lo, hi = spans[0]
+        for span_lo, span_hi in spans[1:]:
+            if span_lo > hi: slot_keys.extend(range(lo, hi, slot_minutes)); lo = span_lo
+            hi = max(hi, span_hi)
+        slot_keys.extend(range(lo, hi, slot_minutes))
+    if len(shift_spans) > 1: slot_keys.sort()
+    return slot_keys, sorted(slot_events)
+
+# Output row of the engine: {"Time": label, position: cell, ...} with one name (or "") per work position and
+# the comma-joined names in the GROUP_COLUMNS cells. members keeps those names as lists, so consumers never
+# split a cell (names may contain commas).
+class ScheduleRow(dict):
+    def __init__(self, cells=(), members=None):
+        super().__init__(cells)
+        self.members = members if members is not None else {} # group column -> names in the cell, in order
+
+# Sweep state of one slot grid (slot key % slot_minutes). Shifts off the slot grid put their employees on a
+# separate grid, which is only scheduled with the employees on it.
+class _SweepGrid:
+    def __init__(self):
+        self.on_shift = {}       # roster index -> (employee id, state)
+        self.stale = True        # on_shift changed since the lists below were built
+        self.in_roster = None    # (employee id, state) in roster order
+        self.by_name = None      # the same, ordered by employee id (= by name)
+        self.signature = None    # (name, state) in roster order, for checkpoints
+        self.last_minute = None  # schedule minute, store-open flag, row and assignments of the grid's previous slot
+        self.last_open = None
+        self.last_row = None
+        self.last_assigns = None
+
+# Scheduling engine. Yields (slot minute, row) per time slot as soon as the slot has been assigned, so callers
+# can write output while the day is still being scheduled. The slot minute counts from midnight of the
+# schedule day (past 1440 for slots after midnight, negative for slots the evening before) and the row is {"Time": label, position: employee(s), ...}.
+# slot_minutes (one of SLOT_MINUTES_CHOICES) is the length of each row; stations still rotate every half hour.
+# Checkpoints are saved once the generator has been consumed to the end.
+def iter_schedule_rows(store_open_time_obj, store_close_time_obj, employee_data_list, checkpoints=None, stats=None, slot_minutes=DEFAULT_SLOT_MINUTES):
+    if slot_minutes not in SLOT_MINUTES_CHOICES: raise ValueError(f"slot_minutes must be one of {SLOT_MINUTES_CHOICES}, got {slot_minutes!r}")
+    if stats is not None: t0 = perf_counter()
+    windows = _employee_windows(employee_data_list, REF_DATE_FOR_PARSING)
+    if stats is not None: t0 = stats.lap("parse", t0)
+    day_start_minute = _schedule_start_minute(store_open_time_obj, store_close_time_obj, windows, slot_minutes)
+    emp_names, slot_events, shift_spans = _slot_events(windows, day_start_minute, slot_minutes)
+    if stats is not None: t0 = stats.lap("expand", t0)
+    if not slot_events: return
+    slot_keys, event_keys = _slot_timeline(slot_events, shift_spans, slot_minutes)
+    if stats is not None: stats.lap("time_map", t0); stats.counters["slots"] = len(slot_keys) # known before the first row, for progress
+    yield from _assign_slots(store_open_time_obj, store_close_time_obj, emp_names, slot_events, slot_keys, event_keys, checkpoints, stats, slot_minutes, day_start_minute)
+
+# The event sweep over the slot keys (in order). A slot is decided from scratch at the start of every
+# half-hour rotation (so every slot at the 30-minute default) and when the store opens or closes. When the
+# roster changes inside a rotation the floor is patched: employees still available keep their stations and the
+# rest are refilled. Any other slot repeats the previous row, so the work follows the roster events and
+# rotations rather than the number of slots.
+# Employees and positions are small integer ids (positions index work_positions_priority_order), the carried
+# state lives in flat lists allocated once per run, and the per-slot buffers are reused; names and clock labels
+# are only produced for the output rows.
+def _assign_slots(store_open_time_obj, store_close_time_obj, emp_names, slot_events, slot_keys, event_keys, checkpoints=None, stats=None, slot_minutes=DEFAULT_SLOT_MINUTES,
+                  day_start_minute=None):
+    if stats is not None: loop_t0 = perf_counter(); loop_seconds = 0.0
     # Use the passed store hours
     STORE_OPEN_TIME = store_open_time_obj
     STORE_CLOSE_TIME = store_close_time_obj
-    REF_DATE_FOR_PARSING = datetime(1970, 1, 1).date() # Consistent ref date
 
-    positions_ordered = ["Handout", "Line Buster 1", "Conductor", "Line Buster 2", "Expo", "Drink Maker 1", "Drink Maker 2", "Line Buster 3", "Break", "ToffTL"]
     work_positions_priority_order = ["Handout", "Line Buster 1", "Conductor", "Line Buster 2", "Expo", "Drink Maker 1", "Drink Maker 2", "Line Buster 3"]
     line_buster_roles = ["Line Buster 1", "Line Buster 2", "Line Buster 3"]
+    n_positions = len(work_positions_priority_order); pos_id = {p: i for i, p in enumerate(work_positions_priority_order)}
+    is_line_buster = [p in line_buster_roles for p in work_positions_priority_order]
+    CONDUCTOR = pos_id["Conductor"]
     paired_position_defs = {
-        "HLB1": {"pos1": "Handout", "pos2": "Line Buster 1", "emps": (None, None), "emp1_is_pos1_in_first_half": True, "slots_done_this_hour": 0, "is_broken_this_hour": False},
-        "LB2E": {"pos1": "Line Buster 2", "pos2": "Expo", "emps": (None, None), "emp1_is_pos1_in_first_half": True, "slots_done_this_hour": 0, "is_broken_this_hour": False}
+        "HLB1": {"pos1": pos_id["Handout"], "pos2": pos_id["Line Buster 1"], "emps": (None, None), "emp1_is_pos1_in_first_half": True, "slots_done_this_hour": 0, "is_broken_this_hour": False},
+        "LB2E": {"pos1": pos_id["Line Buster 2"], "pos2": pos_id["Expo"], "emps": (None, None), "emp1_is_pos1_in_first_half": True, "slots_done_this_hour": 0, "is_broken_this_hour": False}
     }
+    pair_of_position = [None] * n_positions
+    for pid, pdef in paired_position_defs.items(): pair_of_position[pdef["pos1"]] = pair_of_position[pdef["pos2"]] = pid
     essential_positions_for_backfill = ["Handout", "Line Buster 1"]
 
+    if day_start_minute is None: day_start_minute = _schedule_start_minute(STORE_OPEN_TIME, STORE_CLOSE_TIME)
 
-    df = preprocess_employee_data_to_long_format(employee_data_list, REF_DATE_FOR_PARSING)
-    if df.empty: return "No employee slots generated from input."
-
-    try: 
-        df['TimeObject'] = pd.to_datetime(df['Time'], format='%I:%M %p', errors='coerce').fillna(pd.to_datetime(df['Time'], errors='coerce'))
-        unique_times = df.drop_duplicates(subset=['TimeObject']).sort_values(by='TimeObject')
-        all_slots_str, time_map = list(unique_times['Time']), pd.Series(unique_times['TimeObject'].values, index=unique_times['Time']).to_dict()
-        if df['TimeObject'].isnull().any(): raise ValueError("Some times still unparsed after fallback.")
-    except Exception as e:
-        print(f"Time sort warning: {e}. Using string sort as fallback."); all_slots_str = sorted(df['Time'].unique())
-        time_map = {ts: parse_time_input(ts, REF_DATE_FOR_PARSING) for ts in all_slots_str}
-
-    emp_info_map = {t: [] for t in all_slots_str}
-    for _, r in df.iterrows(): emp_info_map[r['Time']].append({"name":r['EmployeeNameFML'], "role_scheduled_as":str(r['Position Scheduled As']).strip(), "is_unpaid_break":str(r['Unpaid Break']).strip().upper() in ['TRUE','YES','1','X','T']})
+    # Store hours as seconds of the day; open == close means the store never closes.
+    open_sec = STORE_OPEN_TIME.hour * 3600 + STORE_OPEN_TIME.minute * 60 + STORE_OPEN_TIME.second
+    close_sec = STORE_CLOSE_TIME.hour * 3600 + STORE_CLOSE_TIME.minute * 60 + STORE_CLOSE_TIME.second
 
     schedule_rows = []
-    emp_lb_last = {}; emp_cur_pos = {}; emp_time_cur_pos = {}; emp_last_time_spec_pos = {}
+    # Carried state per employee id; emp_last_time_spec_pos[emp * n_positions + pos] is the time step of the
+    # employee's last turn at the position (-1: never)
+    n_emps = len(emp_names)
+    emp_lb_last = [False] * n_emps; emp_cur_pos = [NO_POSITION] * n_emps; emp_time_cur_pos = [0] * n_emps
+    emp_last_time_spec_pos = [-1] * (n_emps * n_positions)
     g_time_step = 0
+    # Per-slot buffers. cur_assigns holds an employee id per work position (0: open). assigned_in_slot[emp] and
+    # available_in_slot[emp] equal slot_stamp when the employee is placed (or on break/ToffTL), respectively
+    # available for work, in the current slot.
+    cur_assigns = [0] * n_positions; open_positions = [0] * n_positions
+    on_break = []; on_tofftl = []; avail_for_work = []; still_unassigned_available = []
+    assigned_in_slot = [0] * n_emps; available_in_slot = [0] * n_emps; slot_stamp = 0
+    # Loop counters, reported through stats
+    open_slots = attempt_escalations = pair_breaks = backfill_assignments = unfilled_positions = 0
+    decided_slots = patched_slots = repeated_slots = 0
 
-    for time_slot in all_slots_str:
-        g_time_step += 1; cur_assigns = {p:"" for p in positions_ordered}; 
-        cur_assigns["Break"]=[]; cur_assigns["ToffTL"]=[]
-        
-        active_emps_details = emp_info_map.get(time_slot,[])
-        processed_this_slot_initially = set() 
-        avail_for_work = [] 
-        sorted_active_emps = sorted(active_emps_details, key=lambda x: x['name'])
-
-        for emp_d in sorted_active_emps: 
-            emp_n = emp_d["name"]
-            if emp_d["is_unpaid_break"]: 
-                processed_this_slot_initially.add(emp_n); cur_assigns["Break"].append(emp_n)
-                emp_lb_last[emp_n]=False; emp_cur_pos[emp_n]=None; emp_time_cur_pos[emp_n]=0
-            elif emp_d["role_scheduled_as"] == "ToffTL": 
-                processed_this_slot_initially.add(emp_n); cur_assigns["ToffTL"].append(emp_n)
-                emp_lb_last[emp_n]=False; emp_cur_pos[emp_n]=None; emp_time_cur_pos[emp_n]=0
-        
-        for emp_d in sorted_active_emps: 
-            if emp_d["name"] not in processed_this_slot_initially:
-                avail_for_work.append(emp_d["name"])
-        
-        currently_assigned_this_slot_overall = processed_this_slot_initially.copy()
-
-        curr_time_obj = time_map.get(time_slot); is_store_open_for_slot = False
-        if pd.notna(curr_time_obj):
-            current_slot_time_component = curr_time_obj.time()
-            if STORE_OPEN_TIME <= STORE_CLOSE_TIME: 
-                if STORE_OPEN_TIME <= current_slot_time_component < STORE_CLOSE_TIME:
-                    is_store_open_for_slot = True
-            else: 
-                if current_slot_time_component >= STORE_OPEN_TIME or current_slot_time_component < STORE_CLOSE_TIME:
-                    is_store_open_for_slot = True
-        
-        if is_store_open_for_slot:
-            # --- Backfill pass for essential positions has been removed as per latest user prompt
-            # --- focusing on the layered ideal -> relax -> relax -> final backfill for all available.
-            # --- The "Strict Priority" is handled by order of work_positions_priority_order and the
-            # --- higher_priority_pos_filled_in_main_pass flag.
-            # TonTL employees are now part of avail_for_work if not on break/ToffTL.
-            # No special pre-assignment for TonTL to Line Buster 2.
-
-            higher_priority_pos_filled_in_main_pass = True 
+    # Slots whose inputs match the checkpointed run replay its rows; at the first difference the carried state
+    # is restored from the snapshot before that slot and scheduling carries on from there
+    resume_idx = 0; snapshots = []; slot_signatures = []; slot_counters = []; snapshot_stale = True
+    replaying = checkpoints is not None and checkpoints.run_signature == (day_start_minute, open_sec, close_sec, slot_minutes)
+    candidate_index = _PositionCandidateIndex(n_positions, emp_last_time_spec_pos, n_emps)
+    grids = {}; next_event = 0; emp_id = None  # name -> id, only needed to replay checkpointed rows
+    # The loop counters as saved in checkpoints.slot_counters (open_slots is counted on replayed slots as well)
+    loop_counts = lambda: (decided_slots, patched_slots, repeated_slots, candidate_index.queries, candidate_index.stale_entries, attempt_escalations, pair_breaks,
+                           backfill_assignments, unfilled_positions)
+
+    for slot_key in slot_keys:
+        while next_event < len(event_keys) and event_keys[next_event] <= slot_key:
+            event_key = event_keys[next_event]; next_event += 1
+            event_grid = grids.get(event_key % slot_minutes)
+            if event_grid is None: event_grid = grids[event_key % slot_minutes] = _SweepGrid()
+            for idx, emp_state in slot_events[event_key]:
+                if emp_state is None: del event_grid.on_shift[idx]
+                else: event_grid.on_shift[idx] = emp_state
+            event_grid.stale = True
+        grid = grids[slot_key % slot_minutes]; roster_changed = False
+        if grid.stale:
+            in_roster = [grid.on_shift[i] for i in sorted(grid.on_shift)]
+            roster_changed = in_roster != grid.in_roster; grid.stale = False
+            grid.in_roster = in_roster; grid.by_name = sorted(in_roster, key=lambda es: es[0])
+            if checkpoints is not None: grid.signature = tuple((emp_names[emp], state) for emp, state in in_roster)
+
+        schedule_minute = day_start_minute + slot_key; slot_minute_of_day = schedule_minute % MINUTES_PER_DAY
+        slot_sec = slot_minute_of_day * 60
+        if open_sec < close_sec: is_store_open_for_slot = open_sec <= slot_sec < close_sec
+        elif open_sec > close_sec: is_store_open_for_slot = slot_sec >= open_sec or slot_sec < close_sec
+        else: is_store_open_for_slot = True
+        open_slots += is_store_open_for_slot
+        # At the 30-minute default every slot is a rotation of its own, whatever minute it starts on
+        if slot_minutes == ROTATION_MINUTES or grid.last_minute is None:
+            is_rotation_start = True; is_on_hour = slot_minute_of_day % 60 == 0
+        else:
+            is_rotation_start = schedule_minute // ROTATION_MINUTES != grid.last_minute // ROTATION_MINUTES
+            is_on_hour = schedule_minute // 60 != grid.last_minute // 60
+
+        if checkpoints is not None:
+            slot_signatures.append((slot_key, grid.signature))
+            if replaying and not (resume_idx < len(checkpoints.slot_signatures) and checkpoints.slot_signatures[resume_idx] == slot_signatures[-1]):
+                replaying = False
+                if resume_idx:
+                    g_time_step = _restore_slot_state(checkpoints.snapshots[resume_idx], emp_names, emp_lb_last, emp_cur_pos, emp_time_cur_pos,
+                                                      emp_last_time_spec_pos, paired_position_defs)
+                    (decided_slots, patched_slots, repeated_slots, candidate_index.queries, candidate_index.stale_entries, attempt_escalations, pair_breaks,
+                     backfill_assignments, unfilled_positions) = checkpoints.slot_counters[resume_idx] # the replayed rows still count
+            slot_counters.append(checkpoints.slot_counters[resume_idx] if replaying else loop_counts())
+            if replaying: snapshots.append(checkpoints.snapshots[resume_idx])
+            elif snapshot_stale or not snapshots:
+                snapshots.append(_snapshot_slot_state(emp_names, emp_lb_last, emp_cur_pos, emp_time_cur_pos, emp_last_time_spec_pos, paired_position_defs, g_time_step)); snapshot_stale = False
+            else: snapshots.append(snapshots[-1])
+
+        if replaying:
+            row_data = checkpoints.rows[resume_idx][1]; resume_idx += 1
+            if emp_id is None: emp_id = {name: i for i, name in enumerate(emp_names)}
+            grid.last_assigns = [emp_id[row_data[p]] for p in work_positions_priority_order]
+        elif not (is_rotation_start or roster_changed or is_store_open_for_slot != grid.last_open):
+            row_data = ScheduleRow(grid.last_row, grid.last_row.members); row_data["Time"] = _slot_labels_by_minute()[slot_minute_of_day]
+            repeated_slots += 1
+            if is_store_open_for_slot: unfilled_positions += grid.last_assigns.count(0)
+        else:
+            is_patch = not is_rotation_start and is_store_open_for_slot == grid.last_open
+            if is_patch: patched_slots += 1
+            else: g_time_step += 1; decided_slots += 1
+            snapshot_stale = True
+            slot_stamp += 1; cur_assigns[:] = open_positions
+            on_break.clear(); on_tofftl.clear(); avail_for_work.clear()
+            active_emps = grid.by_name
+
+            for emp, state in active_emps:
+                if state == ON_BREAK or state == ON_TOFFTL:
+                    assigned_in_slot[emp] = slot_stamp; (on_break if state == ON_BREAK else on_tofftl).append(emp)
+                    emp_lb_last[emp] = False; emp_cur_pos[emp] = NO_POSITION; emp_time_cur_pos[emp] = 0
+
+            for emp, state in active_emps:
+                if assigned_in_slot[emp] != slot_stamp:
+                    avail_for_work.append(emp); available_in_slot[emp] = slot_stamp
+
+            if is_patch: # Inside a rotation everyone still available keeps their station
+                for pos_kept, emp_kept in enumerate(grid.last_assigns):
+                    if emp_kept and available_in_slot[emp_kept] == slot_stamp and assigned_in_slot[emp_kept] != slot_stamp:
+                        cur_assigns[pos_kept] = emp_kept; assigned_in_slot[emp_kept] = slot_stamp
+
+            if is_store_open_for_slot:
+                # --- Backfill pass for essential positions has been removed as per latest user prompt
+                # --- focusing on the layered ideal -> relax -> relax -> final backfill for all available.
+                # --- The "Strict Priority" is handled by order of work_positions_priority_order and the
+                # --- higher_priority_pos_filled_in_main_pass flag.
+                # TonTL employees are now part of avail_for_work if not on break/ToffTL.
+                # No special pre-assignment for TonTL to Line Buster 2.
+
+                higher_priority_pos_filled_in_main_pass = True 
+                candidate_index.start_slot(avail_for_work)
+                conductor_continuers = sorted(e for e in avail_for_work if emp_cur_pos[e] == CONDUCTOR and emp_time_cur_pos[e] == 1)
             
-            if pd.notna(curr_time_obj) and curr_time_obj.minute == 0: 
-                for pair_id in paired_position_defs:
-                    paired_position_defs[pair_id]["is_broken_this_hour"] = False
-                    if paired_position_defs[pair_id]["slots_done_this_hour"] == 2:
-                        paired_position_defs[pair_id]["slots_done_this_hour"] = 0
-                        paired_position_defs[pair_id]["emps"] = (None, None)
-
-            for pos_to_fill in work_positions_priority_order:
-                if not higher_priority_pos_filled_in_main_pass: 
-                    cur_assigns[pos_to_fill] = ""; continue 
-                if cur_assigns[pos_to_fill]: 
-                    higher_priority_pos_filled_in_main_pass = True; continue 
-
-                chosen_candidate = None
+                if is_on_hour: 
+                    for pair_id in paired_position_defs:
+                        paired_position_defs[pair_id]["is_broken_this_hour"] = False
+                        if paired_position_defs[pair_id]["slots_done_this_hour"] == 2:
+                            paired_position_defs[pair_id]["slots_done_this_hour"] = 0
+                            paired_position_defs[pair_id]["emps"] = (None, None)
+
+                for pos_to_fill in range(n_positions):
+                    if not higher_priority_pos_filled_in_main_pass: 
+                        if cur_assigns[pos_to_fill]: assigned_in_slot[cur_assigns[pos_to_fill]] = 0 # a kept employee goes to the backfill pass
+                        cur_assigns[pos_to_fill] = 0; continue 
+                    if cur_assigns[pos_to_fill]: 
+                        higher_priority_pos_filled_in_main_pass = True; continue 
+
+                    chosen_candidate = None
+                    current_pair_id = pair_of_position[pos_to_fill]
+                    # Shared eligibility for the pair and individual LRU sites
+                    is_lru_eligible = lambda e: assigned_in_slot[e] != slot_stamp and not (is_line_buster[pos_to_fill] and emp_lb_last[e]) and not (emp_cur_pos[e] == pos_to_fill and emp_time_cur_pos[e] >= 1)
                 
-                for attempt_level in range(3): # 0: Ideal, 1: Relax Pairs, 2: Relax Conductor Start for Conductor
-                    if chosen_candidate: break 
+                    for attempt_level in range(3): # 0: Ideal, 1: Relax Pairs, 2: Relax Conductor Start for Conductor
+                        if chosen_candidate: break 
+                        if attempt_level: attempt_escalations += 1
                     
-                    current_pair_id = None
-                    for pid, pdef_val in paired_position_defs.items(): # Renamed pdef to pdef_val
-                        if pos_to_fill == pdef_val["pos1"] or pos_to_fill == pdef_val["pos2"]:
-                            current_pair_id = pid; break
-                    
-                    # --- Attempt to fill pos_to_fill based on attempt_level ---
-                    if pos_to_fill == "Conductor":
-                        potential_c_cont = [e for e in avail_for_work if e not in currently_assigned_this_slot_overall and emp_cur_pos.get(e)==pos_to_fill and emp_time_cur_pos.get(e,0)==1]
-                        if potential_c_cont: chosen_candidate = sorted(potential_c_cont)[0]
-                        else:
-                            is_on_hour_cond = pd.notna(curr_time_obj) and curr_time_obj.minute == 0
-                            can_start_new_conductor = is_on_hour_cond or (attempt_level >= 2) # Relax on-hour for level 2+
-                            if can_start_new_conductor:
-                                elig_new_c = [e for e in avail_for_work if e not in currently_assigned_this_slot_overall and not (emp_cur_pos.get(e)==pos_to_fill and emp_time_cur_pos.get(e,0)>=2)]
-                                if elig_new_c:
-                                    temp_c=None; min_lt_c=float('inf')
-                                    for c_cand in elig_new_c:
-                                        lt=emp_last_time_spec_pos.get(c_cand,{}).get(pos_to_fill,-1)
-                                        if lt<min_lt_c:min_lt_c=lt;temp_c=c_cand
-                                        elif lt==min_lt_c and (temp_c is None or c_cand<temp_c):temp_c=c_cand
-                                    chosen_candidate=temp_c
-                    elif current_pair_id and (attempt_level == 0 and not paired_position_defs[current_pair_id]["is_broken_this_hour"]):
-                        # Ideal Paired Logic (Simplified for filling one part of the pair at a time)
-                        pair_info = paired_position_defs[current_pair_id]; p1, p2 = pair_info["pos1"], pair_info["pos2"]; eA, eB = pair_info["emps"]
-                        if pair_info["slots_done_this_hour"] == 1 and eA and eB and eA not in currently_assigned_this_slot_overall and eB not in currently_assigned_this_slot_overall: 
-                            # Determine which employee should take pos_to_fill for the swap
-                            emp_for_swap = None
-                            if pos_to_fill == p1: emp_for_swap = eB if pair_info["emp1_is_pos1_in_first_half"] else eA
-                            elif pos_to_fill == p2: emp_for_swap = eA if pair_info["emp1_is_pos1_in_first_half"] else eB
-                            if emp_for_swap and not (pos_to_fill in line_buster_roles and emp_lb_last.get(emp_for_swap,False)): chosen_candidate = emp_for_swap
-                        elif pair_info["slots_done_this_hour"] == 0 or pair_info["slots_done_this_hour"] == 2: 
-                            # Try to find a new person for this part of a new pair (pos_to_fill)
-                            elig_for_new_pair_part = [e for e in avail_for_work if e not in currently_assigned_this_slot_overall and not (pos_to_fill in line_buster_roles and emp_lb_last.get(e,False)) and not (emp_cur_pos.get(e)==pos_to_fill and emp_time_cur_pos.get(e,0)>=1)]
-                            if elig_for_new_pair_part:
-                                cand_part=None;min_lt_part=float('inf')
-                                for c_part in elig_for_new_pair_part:
-                                    lt_part=emp_last_time_spec_pos.get(c_part,{}).get(pos_to_fill,-1)
-                                    if lt_part<min_lt_part:min_lt_part=lt_part;cand_part=c_part
-                                    elif lt_part==min_lt_part and (cand_part is None or c_part<cand_part):cand_part=c_part
-                                chosen_candidate = cand_part
-                    elif current_pair_id and attempt_level == 1: # Relaxed Pair (LRU for this part of pair)
-                        paired_position_defs[current_pair_id]["is_broken_this_hour"] = True # Mark pair as broken for this hour
-                        elig_relax_pair = [e for e in avail_for_work if e not in currently_assigned_this_slot_overall and not (pos_to_fill in line_buster_roles and emp_lb_last.get(e,False)) and not (emp_cur_pos.get(e)==pos_to_fill and emp_time_cur_pos.get(e,0)>=1)]
-                        if elig_relax_pair: 
-                            temp_relax=None;min_lt_relax=float('inf')
-                            for c_relax in elig_relax_pair:
-                                lt_relax=emp_last_time_spec_pos.get(c_relax,{}).get(pos_to_fill,-1)
-                                if lt_relax<min_lt_relax:min_lt_relax=lt_relax;temp_relax=c_relax
-                                elif lt_relax==min_lt_relax and (temp_relax is None or c_relax<temp_relax):temp_relax=c_relax
-                            chosen_candidate=temp_relax
-                    elif not current_pair_id : # Individual position (not Conductor, not part of a pair being ideally handled)
-                        elig_lru = [e for e in avail_for_work if e not in currently_assigned_this_slot_overall and not (pos_to_fill in line_buster_roles and emp_lb_last.get(e,False)) and not (emp_cur_pos.get(e)==pos_to_fill and emp_time_cur_pos.get(e,0)>=1)]
-                        if elig_lru: 
-                            temp_lru=None;min_lt_lru=float('inf')
-                            for c_lru in elig_lru:
-                                lt_lru=emp_last_time_spec_pos.get(c_lru,{}).get(pos_to_fill,-1)
-                                if lt_lru<min_lt_lru:min_lt_lru=lt_lru;temp_lru=c_lru
-                                elif lt_lru==min_lt_lru and (temp_lru is None or c_lru<temp_lru):temp_lru=c_lru
-                            chosen_candidate=temp_lru
+                        # --- Attempt to fill pos_to_fill based on attempt_level ---
+                        if pos_to_fill == CONDUCTOR:
+                            potential_c_cont = [e for e in conductor_continuers if assigned_in_slot[e] != slot_stamp]
+                            if potential_c_cont: chosen_candidate = potential_c_cont[0]
+                            else:
+                                can_start_new_conductor = is_on_hour or (attempt_level >= 2) # Relax on-hour for level 2+
+                                if can_start_new_conductor:
+                                    chosen_candidate = candidate_index.best(pos_to_fill, lambda e: assigned_in_slot[e] != slot_stamp and not (emp_cur_pos[e] == pos_to_fill and emp_time_cur_pos[e] >= 2))
+                        elif current_pair_id and (attempt_level == 0 and not paired_position_defs[current_pair_id]["is_broken_this_hour"]):
+                            # Ideal Paired Logic (Simplified for filling one part of the pair at a time)
+                            pair_info = paired_position_defs[current_pair_id]; p1, p2 = pair_info["pos1"], pair_info["pos2"]; eA, eB = pair_info["emps"]
+                            if pair_info["slots_done_this_hour"] == 1 and eA and eB and assigned_in_slot[eA] != slot_stamp and assigned_in_slot[eB] != slot_stamp: 
+                                # Determine which employee should take pos_to_fill for the swap
+                                emp_for_swap = None
+                                if pos_to_fill == p1: emp_for_swap = eB if pair_info["emp1_is_pos1_in_first_half"] else eA
+                                elif pos_to_fill == p2: emp_for_swap = eA if pair_info["emp1_is_pos1_in_first_half"] else eB
+                                if emp_for_swap and not (is_line_buster[pos_to_fill] and emp_lb_last[emp_for_swap]): chosen_candidate = emp_for_swap
+                            elif pair_info["slots_done_this_hour"] == 0 or pair_info["slots_done_this_hour"] == 2: 
+                                # Try to find a new person for this part of a new pair (pos_to_fill)
+                                chosen_candidate = candidate_index.best(pos_to_fill, is_lru_eligible)
+                        elif current_pair_id and attempt_level == 1: # Relaxed Pair (LRU for this part of pair)
+                            if not paired_position_defs[current_pair_id]["is_broken_this_hour"]: pair_breaks += 1
+                            paired_position_defs[current_pair_id]["is_broken_this_hour"] = True # Mark pair as broken for this hour
+                            chosen_candidate = candidate_index.best(pos_to_fill, is_lru_eligible)
+                        elif not current_pair_id : # Individual position (not Conductor, not part of a pair being ideally handled)
+                            chosen_candidate = candidate_index.best(pos_to_fill, is_lru_eligible)
                 
-                # --- Assign if chosen_candidate found in any attempt for this pos_to_fill ---
-                if chosen_candidate:
-                    emp_assigned = chosen_candidate
-                    cur_assigns[pos_to_fill] = emp_assigned; currently_assigned_this_slot_overall.add(emp_assigned) 
-                    emp_lb_last[emp_assigned] = (pos_to_fill in line_buster_roles)
-                    if emp_cur_pos.get(emp_assigned) == pos_to_fill: emp_time_cur_pos[emp_assigned] = emp_time_cur_pos.get(emp_assigned, 0) + 1
-                    else: emp_cur_pos[emp_assigned] = pos_to_fill; emp_time_cur_pos[emp_assigned] = 1
-                    emp_last_time_spec_pos.setdefault(emp_assigned, {})[pos_to_fill] = g_time_step
-                    higher_priority_pos_filled_in_main_pass = True
+                    # --- Assign if chosen_candidate found in any attempt for this pos_to_fill ---
+                    if chosen_candidate:
+                        emp_assigned = chosen_candidate
+                        cur_assigns[pos_to_fill] = emp_assigned; assigned_in_slot[emp_assigned] = slot_stamp
+                        emp_lb_last[emp_assigned] = is_line_buster[pos_to_fill]
+                        if emp_cur_pos[emp_assigned] == pos_to_fill: emp_time_cur_pos[emp_assigned] += 1
+                        else: emp_cur_pos[emp_assigned] = pos_to_fill; emp_time_cur_pos[emp_assigned] = 1
+                        emp_last_time_spec_pos[emp_assigned * n_positions + pos_to_fill] = g_time_step
+                        candidate_index.record(emp_assigned, pos_to_fill, g_time_step)
+                        higher_priority_pos_filled_in_main_pass = True
                     
-                    # Update paired rotation state if this assignment was part of it
-                    if current_pair_id and not paired_position_defs[current_pair_id]["is_broken_this_hour"]:
-                        pair_info = paired_position_defs[current_pair_id]
-                        p1_name = pair_info["pos1"] #; p2_name = pair_info["pos2"] # Not needed here
-                        if pair_info["slots_done_this_hour"] == 1: # This was the swap completing the second half for the pair
-                            pair_info["slots_done_this_hour"] = 2
-                        elif pair_info["slots_done_this_hour"] == 0: # First half of a new pair
-                            # This assignment is one half of the pair.
-                            # If Handout (p1) was just filled by emp_assigned:
-                            if pos_to_fill == p1_name:
-                                pair_info["emps"] = (emp_assigned, None)
-                                pair_info["emp1_is_pos1_in_first_half"] = True
-                            else: # pos_to_fill was p2
-                                pair_info["emps"] = (None, emp_assigned) # This assumes p1 would be filled by another iteration
-                                pair_info["emp1_is_pos1_in_first_half"] = False # This assignment was p2
-                            # If both parts of pair get filled in this time slot (by different iterations of pos_to_fill)
-                            # this simplified state update will need adjustment or rely on the next slot to confirm pair.
-                            # For now, if either part of a "new" pair is filled, we mark slots_done_this_hour to 1
-                            # This means the *next* slot will attempt a swap if the *other half* also gets filled.
-                            # This logic for pair formation is simplified and might need more robust handling
-                            # to ensure two distinct people are chosen for a new pair simultaneously.
-                            # The current loop processes one pos_to_fill at a time.
-                            if pair_info["emps"][0] and pair_info["emps"][1]: # If both are somehow filled
-                                pair_info["slots_done_this_hour"] = 1
-                            elif pair_info["emps"][0] or pair_info["emps"][1]: # If one part is filled
-                                # Let's assume if one part is filled, we tentatively start the hour for that person
-                                # The other part needs to be filled by its own pos_to_fill iteration.
-                                # This state update is tricky with sequential filling.
-                                pass # For now, leave slots_done_this_hour as 0 until both are confirmed or reset.
-                                    # This implies the paired rotation might not form correctly if p2 doesn't find someone.
-
-                else: # No candidate found for this pos_to_fill even after relaxations
-                    higher_priority_pos_filled_in_main_pass = False; cur_assigns[pos_to_fill] = "" 
+                        # Update paired rotation state if this assignment was part of it
+                        if current_pair_id and not paired_position_defs[current_pair_id]["is_broken_this_hour"]:
+                            pair_info = paired_position_defs[current_pair_id]
+                            p1_name = pair_info["pos1"] #; p2_name = pair_info["pos2"] # Not needed here
+                            if pair_info["slots_done_this_hour"] == 1: # This was the swap completing the second half for the pair
+                                pair_info["slots_done_this_hour"] = 2
+                            elif pair_info["slots_done_this_hour"] == 0: # First half of a new pair
+                                # This assignment is one half of the pair.
+                                # If Handout (p1) was just filled by emp_assigned:
+                                if pos_to_fill == p1_name:
+                                    pair_info["emps"] = (emp_assigned, None)
+                                    pair_info["emp1_is_pos1_in_first_half"] = True
+                                else: # pos_to_fill was p2
+                                    pair_info["emps"] = (None, emp_assigned) # This assumes p1 would be filled by another iteration
+                                    pair_info["emp1_is_pos1_in_first_half"] = False # This assignment was p2
+                                # If both parts of pair get filled in this time slot (by different iterations of pos_to_fill)
+                                # this simplified state update will need adjustment or rely on the next slot to confirm pair.
+                                # For now, if either part of a "new" pair is filled, we mark slots_done_this_hour to 1
+                                # This means the *next* slot will attempt a swap if the *other half* also gets filled.
+                                # This logic for pair formation is simplified and might need more robust handling
+                                # to ensure two distinct people are chosen for a new pair simultaneously.
+                                # The current loop processes one pos_to_fill at a time.
+                                if pair_info["emps"][0] and pair_info["emps"][1]: # If both are somehow filled
+                                    pair_info["slots_done_this_hour"] = 1
+                                elif pair_info["emps"][0] or pair_info["emps"][1]: # If one part is filled
+                                    # Let's assume if one part is filled, we tentatively start the hour for that person
+                                    # The other part needs to be filled by its own pos_to_fill iteration.
+                                    # This state update is tricky with sequential filling.
+                                    pass # For now, leave slots_done_this_hour as 0 until both are confirmed or reset.
+                                        # This implies the paired rotation might not form correctly if p2 doesn't find someone.
+
+                    else: # No candidate found for this pos_to_fill even after relaxations
+                        higher_priority_pos_filled_in_main_pass = False; cur_assigns[pos_to_fill] = 0 
             
-            # --- Final Backfill Pass for any unassigned available employee ---
-            still_unassigned_available = [emp for emp in avail_for_work if emp not in currently_assigned_this_slot_overall]
-            for emp_to_backfill in still_unassigned_available:
-                for pos_bf in work_positions_priority_order: 
-                    if not cur_assigns[pos_bf]: 
-                        if pos_bf in line_buster_roles and emp_lb_last.get(emp_to_backfill, False): continue 
-                        cur_assigns[pos_bf] = emp_to_backfill; currently_assigned_this_slot_overall.add(emp_to_backfill)
-                        emp_lb_last[emp_to_backfill] = (pos_bf in line_buster_roles)
-                        if emp_cur_pos.get(emp_to_backfill) == pos_bf: emp_time_cur_pos[emp_to_backfill] = emp_time_cur_pos.get(emp_to_backfill, 0) + 1
-                        else: emp_cur_pos[emp_to_backfill] = pos_bf; emp_time_cur_pos[emp_to_backfill] = 1
-                        emp_last_time_spec_pos.setdefault(emp_to_backfill, {})[pos_bf] = g_time_step
-                        break # Employee backfilled, move to next unassigned employee
+                # --- Final Backfill Pass for any unassigned available employee ---
+                still_unassigned_available.clear()
+                still_unassigned_available.extend(emp for emp in avail_for_work if assigned_in_slot[emp] != slot_stamp)
+                for emp_to_backfill in still_unassigned_available:
+                    for pos_bf in range(n_positions): 
+                        if not cur_assigns[pos_bf]: 
+                            if is_line_buster[pos_bf] and emp_lb_last[emp_to_backfill]: continue 
+                            cur_assigns[pos_bf] = emp_to_backfill; assigned_in_slot[emp_to_backfill] = slot_stamp
+                            emp_lb_last[emp_to_backfill] = is_line_buster[pos_bf]
+                            if emp_cur_pos[emp_to_backfill] == pos_bf: emp_time_cur_pos[emp_to_backfill] += 1
+                            else: emp_cur_pos[emp_to_backfill] = pos_bf; emp_time_cur_pos[emp_to_backfill] = 1
+                            emp_last_time_spec_pos[emp_to_backfill * n_positions + pos_bf] = g_time_step
+                            candidate_index.record(emp_to_backfill, pos_bf, g_time_step)
+                            backfill_assignments += 1
+                            break # Employee backfilled, move to next unassigned employee
+                candidate_index.end_slot()
+                unfilled_positions += cur_assigns.count(0)
         
-        # --- Final state reset for employees truly unassigned after all passes ---
-        for emp_d_final in active_emps_details:
-            emp_n_f = emp_d_final["name"]
-            assigned_station_finally = any(cur_assigns.get(wp)==emp_n_f for wp in work_positions_priority_order) 
-            if not assigned_station_finally: 
-                if not emp_d_final["is_unpaid_break"] and emp_d_final["role_scheduled_as"] != "ToffTL":
-                    emp_lb_last[emp_n_f]=False; emp_cur_pos[emp_n_f]=None; emp_time_cur_pos[emp_n_f]=0
+            # --- Final state reset for employees truly unassigned after all passes ---
+            for emp, state in active_emps:
+                if state == ON_FLOOR and emp not in cur_assigns:
+                    emp_lb_last[emp] = False; emp_cur_pos[emp] = NO_POSITION; emp_time_cur_pos[emp] = 0
         
-        row_data = {"Time": time_slot}
-        for pos_col in positions_ordered:
-            if pos_col == "Break" or pos_col == "ToffTL": row_data[pos_col] = ", ".join(sorted(list(set(cur_assigns.get(pos_col,[])))))
-            else: row_data[pos_col] = cur_assigns.get(pos_col,"")
-        schedule_rows.append(row_data)
-
-    if not schedule_rows: return "No schedule data."
-    out_df = pd.DataFrame(schedule_rows, columns=["Time"]+positions_ordered)
-    out_df['Break'] = out_df['Break'].apply(lambda x: "" if not x else x)
-    out_df['ToffTL'] = out_df['ToffTL'].apply(lambda x: "" if not x else x)
-    final_df = out_df.set_index("Time").transpose().reset_index().rename(columns={'index':'Position'})
-    return final_df.to_csv(index=False)
+            # Names only come back here, for the output row
+            row_data = ScheduleRow({"Time": _slot_labels_by_minute()[slot_minute_of_day]})
+            for pos_col, emp in zip(work_positions_priority_order, cur_assigns): row_data[pos_col] = emp_names[emp]
+            for group_col, group in zip(GROUP_COLUMNS, (on_break, on_tofftl)):
+                names = [emp_names[e] for e in sorted(set(group))]
+                row_data[group_col] = ", ".join(names); row_data.members[group_col] = names
+            grid.last_assigns = cur_assigns[:]
+
+        if checkpoints is not None: schedule_rows.append((schedule_minute, row_data))
+        grid.last_minute, grid.last_open, grid.last_row = schedule_minute, is_store_open_for_slot, row_data
+        if stats is not None: loop_seconds += perf_counter() - loop_t0
+        yield schedule_minute, row_data
+        if stats is not None: loop_t0 = perf_counter()
+
+    if checkpoints is not None:
+        if replaying:
+            (decided_slots, patched_slots, repeated_slots, candidate_index.queries, candidate_index.stale_entries, attempt_escalations, pair_breaks,
+             backfill_assignments, unfilled_positions) = checkpoints.slot_counters[resume_idx]
+        slot_counters.append(loop_counts())
+        snapshots.append(checkpoints.snapshots[resume_idx] if replaying else _snapshot_slot_state(emp_names, emp_lb_last, emp_cur_pos, emp_time_cur_pos, emp_last_time_spec_pos, paired_position_defs, g_time_step))
+        checkpoints.run_signature = (day_start_minute, open_sec, close_sec, slot_minutes); checkpoints.slot_signatures = slot_signatures
+        checkpoints.snapshots = snapshots; checkpoints.rows = list(schedule_rows); checkpoints.slot_counters = slot_counters
+    if stats is not None:
+        stats.counters.update(slots=len(slot_keys), open_slots=open_slots, resumed_slots=resume_idx, decided_slots=decided_slots, patched_slots=patched_slots,
+                              repeated_slots=repeated_slots, candidate_queries=candidate_index.queries, stale_heap_entries=candidate_index.stale_entries,
+                              attempt_escalations=attempt_escalations, pair_breaks=pair_breaks, backfill_assignments=backfill_assignments,
+                              unfilled_positions=unfilled_positions)
+        stats.record_phase("slot_loop", loop_seconds + perf_counter() - loop_t0)
+
+
+# csv.writer target that hands back each formatted line instead of storing it
+class _CsvLine:
+    def write(self, line):
+        return line
+
+# Structured schedule: slot labels and start minutes plus one list of assignments per position (Break/ToffTL
+# hold comma-joined names, and members the same names as lists). Built directly from the streamed
+# ScheduleRows, without DataFrames.
+class ScheduleResult:
+    def __init__(self, positions):
+        self.positions = list(positions)
+        self.times = []
+        self.slot_minutes = []  # minutes from midnight of the schedule day; past 1440 after midnight
+        self.assignments = {p: [] for p in self.positions}
+        self.members = {p: [] for p in self.positions if p in GROUP_COLUMNS} # per slot: list of names
+
+    def add_row(self, slot_minute, row_data):
+        self.times.append(row_data["Time"]); self.slot_minutes.append(slot_minute)
+        for pos_col in self.positions: self.assignments[pos_col].append(row_data[pos_col])
+        for group_col, names in self.members.items(): names.append(row_data.members[group_col])
+
+    # Start datetime of every slot, for a schedule on schedule_date (defaults to the parsing reference date)
+    def slot_timestamps(self, schedule_date=None):
+        day_midnight = datetime.combine(schedule_date or REF_DATE_FOR_PARSING, time())
+        return [day_midnight + timedelta(minutes=m) for m in self.slot_minutes]
+
+    # Position x time grid as CSV text lines: a header of slot labels, then one line per position
+    def iter_csv_lines(self):
+        writer = csv.writer(_CsvLine(), lineterminator=os.linesep)
+        yield writer.writerow(["Position"] + self.times)
+        for pos_col in self.positions: yield writer.writerow([pos_col] + self.assignments[pos_col])
+
+    def write_csv(self, out):
+        out.writelines(self.iter_csv_lines())
+
+    def to_csv(self):
+        return "".join(self.iter_csv_lines())
+
+    def to_csv_bytes(self, encoding="utf-8"):
+        return b"".join(line.encode(encoding) for line in self.iter_csv_lines())
+
+# Writes each slot as its own CSV line (Time, Handout, ...) as soon as the engine yields it. This time x position
+# layout is the one that can stream; the position x time grid needs every slot before its first line is complete.
+def write_schedule_rows_csv(rows, out):
+    writer = csv.writer(out, lineterminator=os.linesep); header_written = False
+    for _, row_data in rows:
+        if not header_written: writer.writerow(list(row_data)); header_written = True
+        writer.writerow(row_data.values())
+
+# Runs the engine into a ScheduleResult, or returns None when the roster produced no slots
+def build_schedule(store_open_time_obj, store_close_time_obj, employee_data_list, checkpoints=None, stats=None, slot_minutes=DEFAULT_SLOT_MINUTES):
+    result = None
+    for slot_minute, row_data in iter_schedule_rows(store_open_time_obj, store_close_time_obj, employee_data_list, checkpoints, stats, slot_minutes):
+        if result is None: result = ScheduleResult([k for k in row_data if k != "Time"])
+        result.add_row(slot_minute, row_data)
+    return result
+
+# This is the main function Streamlit will call. Returns the position x time grid as CSV text, or for
+# output_format "parquet"/"arrow"/"jsonl"/"columnar" (best available) the typed wide and long tables as
+# {"wide": bytes, "long": bytes} (see scheduler_export). schedule_date dates the slot timestamps. Pass a
+# ScheduleStats as stats to collect per-phase timings and slot-loop counters for the run. slot_minutes sets the
+# row granularity (5, 10, 15 or 30 minutes).
+def create_schedule(store_open_time_obj, store_close_time_obj, employee_data_list, checkpoints=None, output_format="csv", schedule_date=None, stats=None,
+                    slot_minutes=DEFAULT_SLOT_MINUTES):
+    result = build_schedule(store_open_time_obj, store_close_time_obj, employee_data_list, checkpoints, stats, slot_minutes)
+    if result is None: return NO_SLOTS_MESSAGE
+    if stats is not None: t0 = perf_counter()
+    if output_format == "csv": output = result.to_csv()
+    else:
+        from scheduler_export import export_schedule
+        output = export_schedule(result, None if output_format == "columnar" else output_format, schedule_date)
+    if stats is not None: stats.lap("export", t0)
+    return output
 
 # To run this script if it were the main file:
 # if __name__ == "__main__":
@@ -0,0 +1,146 @@
+# File: scheduler_optimizer.py
+# Break placement optimizer. Moves the unpaid break of every employee who has one between the legal windows of
+# their shift to leave as few priority positions uncovered (and break as few Handout/Line Buster pairs) as
+# possible, and returns the best roster found within a time budget together with its schedule.
+#
+#   result = optimize_breaks(time(6, 0), time(22, 0), roster, time_budget=10.0)
+#   result.employee_data_list, result.schedule.to_csv(), result.score, result.baseline_score
+#
+# The search is a coordinate descent: one employee at a time, every other legal break for them is scored and
+# the best strict improvement is kept. The candidates of one employee are scored in parallel on a process pool.
+# Each worker keeps the engine checkpoints of the current best roster, and a candidate only differs from it
+# from the earlier of the old and new break onwards, so only the rest of the day is scheduled again.
+import copy
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from time import perf_counter
+
+from scheduler_logic import (build_schedule, iter_schedule_rows, ScheduleCheckpoints, ScheduleStats, _employee_windows, _slot_labels_by_minute,
+                             REF_DATE_FOR_PARSING, DEFAULT_SLOT_MINUTES, ROTATION_MINUTES, BREAK_SECONDS, MINUTES_PER_DAY)
+
+# Work positions in priority order with the weight of leaving one of them empty for a slot: Handout counts
+# most, Line Buster 3 least
+POSITION_WEIGHTS = (("Handout", 8), ("Line Buster 1", 7), ("Conductor", 6), ("Line Buster 2", 5), ("Expo", 4),
+                    ("Drink Maker 1", 3), ("Drink Maker 2", 2), ("Line Buster 3", 1))
+DEFAULT_TIME_BUDGET = 10.0
+DEFAULT_MIN_WORK_BEFORE_BREAK = 60  # minutes on shift before a break may start
+DEFAULT_MIN_WORK_AFTER_BREAK = 60   # minutes on shift left after a break ends
+
+# Lower is better: (weighted uncovered position slots while the store is open, pair breaks)
+BreakScore = namedtuple("BreakScore", ["uncovered", "pair_breaks"])
+# Best roster found (a copy of the input with Break fields moved), its ScheduleResult (None when the roster
+# produced no slots) and score, the input roster's score, how many candidate rosters were scored, whether the
+# search converged before the time budget ran out, and the wall-clock seconds spent
+BreakOptimization = namedtuple("BreakOptimization", ["employee_data_list", "schedule", "score", "baseline_score", "candidates_scored", "converged", "elapsed_seconds"])
+
+# Legal break start labels for one roster entry: on the shift's half-hour rotation grid, with the required
+# work before and after, and clear of the ToffTL window. None when the entry has no break to move.
+def _break_windows(emp_data, min_work_before, min_work_after):
+    windows = _employee_windows([emp_data], REF_DATE_FOR_PARSING)
+    if not windows: return None
+    _, s_sec, e_sec, t_s, t_e, b_s, b_e = windows[0]
+    if not b_e: return None # no (parsable) break
+    labels = _slot_labels_by_minute(); step = ROTATION_MINUTES * 60
+    first = s_sec - (-(min_work_before * 60) // step) * step # first grid point with the required work before it
+    starts = [sec for sec in range(first, e_sec - min_work_after * 60 - BREAK_SECONDS + 1, step) if not (sec < t_e and t_s < sec + BREAK_SECONDS)]
+    return [labels[(sec // 60) % MINUTES_PER_DAY] for sec in starts]
+
+def _is_store_open(minute_of_day, open_sec, close_sec):
+    slot_sec = minute_of_day * 60
+    if open_sec < close_sec: return open_sec <= slot_sec < close_sec
+    if open_sec > close_sec: return slot_sec >= open_sec or slot_sec < close_sec
+    return True
+
+# Scores break assignments (one break label per movable roster entry) for one store-day. Keeps the checkpoints
+# of the incumbent, the assignment candidates are compared with, so each candidate run resumes where it
+# first differs. One instance lives in every worker process, or in the caller when scoring serially.
+class _BreakScorer:
+    def __init__(self, store_open_time_obj, store_close_time_obj, employee_data_list, movable, slot_minutes):
+        self.store_hours = (store_open_time_obj, store_close_time_obj)
+        self.employee_data_list = employee_data_list
+        self.movable = movable # roster indices whose Break is searched
+        self.slot_minutes = slot_minutes
+        self.open_sec = store_open_time_obj.hour * 3600 + store_open_time_obj.minute * 60 + store_open_time_obj.second
+        self.close_sec = store_close_time_obj.hour * 3600 + store_close_time_obj.minute * 60 + store_close_time_obj.second
+        self.incumbent = None
+        self.incumbent_checkpoints = ScheduleCheckpoints()
+
+    def roster(self, breaks):
+        roster = list(self.employee_data_list)
+        for idx, break_label in zip(self.movable, breaks): roster[idx] = dict(roster[idx], Break=break_label)
+        return roster
+
+    # Schedules the roster resuming from a copy of the given checkpoints (the run replaces their lists rather
+    # than changing them, so a shallow copy leaves the original intact); returns (score, the run's checkpoints)
+    def _run(self, breaks, checkpoints):
+        checkpoints = copy.copy(checkpoints); stats = ScheduleStats(); uncovered = 0
+        for slot_minute, row_data in iter_schedule_rows(*self.store_hours, self.roster(breaks), checkpoints, stats, self.slot_minutes):
+            if _is_store_open(slot_minute % MINUTES_PER_DAY, self.open_sec, self.close_sec):
+                uncovered += sum(weight for pos, weight in POSITION_WEIGHTS if not row_data[pos])
+        return BreakScore(uncovered, stats.counters.get("pair_breaks", 0)), checkpoints
+
+    def score(self, incumbent, breaks):
+        if incumbent != self.incumbent: # the previous incumbent is one break away, so this is mostly a resume too
+            _, self.incumbent_checkpoints = self._run(incumbent, self.incumbent_checkpoints); self.incumbent = incumbent
+        return self._run(breaks, self.incumbent_checkpoints)[0]
+
+_worker_scorer = None
+
+def _init_worker(*scorer_args):
+    global _worker_scorer
+    _worker_scorer = _BreakScorer(*scorer_args)
+
+def _score_in_worker(incumbent, breaks):
+    return breaks, _worker_scorer.score(incumbent, breaks)
+
+# Searches break placements for every roster entry that has a Break, within time_budget seconds, on
+# max_workers processes (default: all cores; 1 scores in this process). Entries without a legal window other
+# than their own keep their break. Returns a BreakOptimization; the input roster is not modified.
+def optimize_breaks(store_open_time_obj, store_close_time_obj, employee_data_list, time_budget=DEFAULT_TIME_BUDGET, max_workers=None,
+                    slot_minutes=DEFAULT_SLOT_MINUTES, min_work_before=DEFAULT_MIN_WORK_BEFORE_BREAK, min_work_after=DEFAULT_MIN_WORK_AFTER_BREAK):
+    started = perf_counter(); deadline = started + time_budget
+    employee_data_list = list(employee_data_list)
+    movable = []; windows = []
+    for idx, emp_data in enumerate(employee_data_list):
+        labels = _break_windows(emp_data, min_work_before, min_work_after)
+        if labels and labels != [emp_data.get("Break")]: movable.append(idx); windows.append(labels)
+    scorer_args = (store_open_time_obj, store_close_time_obj, employee_data_list, movable, slot_minutes)
+    scorer = _BreakScorer(*scorer_args)
+    best = tuple(employee_data_list[idx].get("Break") for idx in movable)
+    baseline_score = best_score = scorer.score(best, best)
+    candidates_scored = 0; converged = False
+
+    max_workers = max_workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=scorer_args) if max_workers > 1 and movable else None
+    try:
+        while not converged and perf_counter() < deadline:
+            improved = out_of_time = False
+            for i, labels in enumerate(windows):
+                if perf_counter() >= deadline: out_of_time = True; break
+                candidates = [best[:i] + (label,) + best[i + 1:] for label in labels if label != best[i]]
+                if pool is None:
+                    scored = []
+                    for breaks in candidates:
+                        if perf_counter() >= deadline: break
+                        scored.append((breaks, scorer.score(best, breaks)))
+                else:
+                    pending = {pool.submit(_score_in_worker, best, breaks) for breaks in candidates}; scored = []
+                    while pending:
+                        done, pending = wait(pending, timeout=max(deadline - perf_counter(), 0), return_when=FIRST_COMPLETED)
+                        if not done: break
+                        scored.extend(future.result() for future in done)
+                    for future in pending: future.cancel()
+                out_of_time = out_of_time or len(scored) < len(candidates)
+                candidates_scored += len(scored)
+                # Strict improvements only, ties broken by candidate order, so the result does not depend on timing
+                order = {breaks: n for n, breaks in enumerate(candidates)}
+                for breaks, score in sorted(scored, key=lambda s: order[s[0]]):
+                    if score < best_score: best, best_score, improved = breaks, score, True
+            converged = not (improved or out_of_time) # a full pass without a better break for anyone
+    finally:
+        if pool is not None: pool.shutdown(wait=False, cancel_futures=True)
+
+    roster = scorer.roster(best)
+    schedule = build_schedule(store_open_time_obj, store_close_time_obj, roster, slot_minutes=slot_minutes)
+    return BreakOptimization(roster, schedule, best_score, baseline_score, candidates_scored, converged, perf_counter() - started)
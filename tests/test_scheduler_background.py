@@ -0,0 +1,46 @@
+# File: tests/test_scheduler_background.py
+# Background generation tests: result cache, cache keys and the ScheduleTask life cycle (no Streamlit needed).
+from datetime import time
+
+from scheduler_background import schedule_cache_key, ScheduleResultCache, ScheduleTask
+from scheduler_logic import create_schedule, ScheduleCheckpoints
+
+def _emp(name, start, end, brk="", tofftl=(None, None)):
+    return {"Name": name, "Shift Start": start, "Shift End": end, "Break": brk, "ToffTL Start": tofftl[0], "ToffTL End": tofftl[1]}
+
+ROSTER = [_emp("Ann Lee", "9:00 AM", "5:00 PM", "1:00 PM", ("10:00 AM", "10:30 AM")), _emp("Bo Ek", "9:00 AM", "1:00 PM")]
+
+def test_cache_evicts_the_least_recently_used_entry():
+    cache = ScheduleResultCache(max_entries=2)
+    cache.put("a", 1); cache.put("b", 2)
+    assert cache.get("a") == 1 # "a" is now the most recent
+    cache.put("c", 3)
+    assert len(cache) == 2 and cache.get("b") is None and (cache.get("a"), cache.get("c")) == (1, 3)
+    cache.put("a", 4); cache.put("d", 5) # updating an entry also makes it the most recent
+    assert (cache.get("a"), cache.get("c"), cache.get("d")) == (4, None, 5)
+
+def test_equivalent_time_spellings_share_a_cache_key():
+    respelled = [_emp("Ann Lee", "09:00", "17:00", " 1:00 pm ", ("10:00 AM", "10:30")), _emp("Bo Ek", "9:00 am", "13:00", "N/A")]
+    key = schedule_cache_key(time(9, 0), time(17, 0), ROSTER)
+    assert schedule_cache_key(time(9, 0), time(17, 0), respelled) == key
+    assert schedule_cache_key(time(9, 0), time(17, 0), ROSTER, slot_minutes=15) != key
+    assert schedule_cache_key(time(9, 0), time(17, 0), [dict(ROSTER[0], Break="1:30 PM"), ROSTER[1]]) != key
+    assert schedule_cache_key(time(9, 0), time(17, 0), [dict(ROSTER[0], Name="Ann  Lee"), ROSTER[1]]) != key # names as typed
+
+def test_finished_task_holds_the_schedule():
+    task = ScheduleTask(time(9, 0), time(17, 0), ROSTER).start(); task.join()
+    assert not task.is_running() and not task.cancelled and task.error is None
+    assert task.outcome.csv_bytes.decode("utf-8") == create_schedule(time(9, 0), time(17, 0), ROSTER)
+    assert task.progress == 1.0 and task.slots_done == task.total_slots == len(task.outcome.result.times)
+
+# A task cancelled before it runs stops at its first slot, with no outcome and the checkpoints untouched
+def test_cancelled_task_leaves_no_outcome_and_the_checkpoints_unchanged():
+    checkpoints = ScheduleCheckpoints()
+    task = ScheduleTask(time(9, 0), time(17, 0), ROSTER, checkpoints=checkpoints)
+    task.cancel(); task.start(); task.join()
+    assert task.cancelled and task.outcome is None and task.error is None and task.slots_done == 0
+    assert checkpoints.rows == [] and checkpoints.run_signature is None
+
+def test_failed_task_reports_the_error():
+    task = ScheduleTask(time(9, 0), time(17, 0), None).start(); task.join()
+    assert task.outcome is None and not task.cancelled and task.error.startswith("TypeError: ")
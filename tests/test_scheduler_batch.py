@@ -0,0 +1,30 @@
+# File: tests/test_scheduler_batch.py
+# Batch runner tests: every job gets exactly one result, whatever goes wrong with the others.
+import os
+from datetime import time
+
+from scheduler_batch import ScheduleBatchRunner, ScheduleJob
+
+ROSTER = [{"Name": "Ann Lee", "Shift Start": "9:00 AM", "Shift End": "1:00 PM", "Break": "11:00 AM"}]
+
+# Unpickling this in a worker kills the worker process, which breaks the pool
+class _KillWorker:
+    def __reduce__(self):
+        return (os._exit, (1,))
+
+def _job(job_id, roster=ROSTER):
+    return ScheduleJob(job_id, time(9, 0), time(17, 0), roster)
+
+def test_malformed_job_is_reported_and_the_batch_goes_on():
+    with ScheduleBatchRunner(max_workers=1) as runner:
+        results = {r.job_id: r for r in runner.run([_job("a"), ("short", time(9, 0)), _job("b")])}
+    assert set(results) == {"a", "short", "b"}
+    assert results["short"].schedule_csv is None and results["short"].error.startswith("TypeError")
+    assert results["a"].error is None and results["b"].error is None and results["b"].schedule_csv.startswith("Position,")
+
+def test_crashed_worker_fails_the_remaining_jobs_without_raising():
+    with ScheduleBatchRunner(max_workers=1, max_pending_per_worker=1) as runner:
+        results = list(runner.run([_job("a"), _job("crash", _KillWorker()), _job("b"), ("short",), _job("c")]))
+    assert sorted(r.job_id for r in results) == ["a", "b", "c", "crash", "short"]
+    failed = {r.job_id for r in results if r.error is not None}
+    assert {"crash", "b", "short", "c"} <= failed and all(r.schedule_csv is None for r in results if r.job_id in failed)
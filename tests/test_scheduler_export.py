@@ -0,0 +1,35 @@
+# File: tests/test_scheduler_export.py
+# Columnar export tests: the long table is built from the schedule's own name lists, never from cell text.
+import json
+from datetime import time
+
+import pytest
+
+from scheduler_logic import build_schedule, ScheduleCheckpoints
+from scheduler_export import export_schedule, schedule_tables
+
+def _emp(name, start, end, brk=""):
+    return {"Name": name, "Shift Start": start, "Shift End": end, "Break": brk, "ToffTL Start": None, "ToffTL End": None}
+
+ROSTER = [_emp("Smith, John", "9:00 AM", "5:00 PM", "12:00 PM"), _emp("Ann Lee", "9:00 AM", "5:00 PM", "12:00 PM"), _emp("Bo Ek", "9:00 AM", "1:00 PM")]
+
+def _assignments(long):
+    return {(t, pos, name) for t, pos, name in zip(long["time"], long["position"], long["employee"])}
+
+# A name with a comma stays one employee on work positions and in the comma-joined Break cell, including
+# in rows repeated inside a rotation and rows replayed from checkpoints
+@pytest.mark.parametrize("slot_minutes", (30, 15))
+def test_long_table_keeps_names_with_commas(slot_minutes):
+    checkpoints = ScheduleCheckpoints()
+    for _ in range(2): # the second run replays every row from the checkpoints
+        result = build_schedule(time(9, 0), time(17, 0), ROSTER, checkpoints, slot_minutes=slot_minutes)
+        long = schedule_tables(result)["long"]
+        assert set(long["employee"]) == {"Smith, J.", "Ann L.", "Bo E."}
+        assert {("12:00 PM", "Break", "Smith, J."), ("12:00 PM", "Break", "Ann L.")} <= _assignments(long)
+        assert result.assignments["Break"][result.times.index("12:00 PM")] == "Ann L., Smith, J."
+        works = [(t, name) for t, pos, name in _assignments(long) if pos not in ("Break", "ToffTL")]
+        assert len(works) == len(set(works)) == sum(1 for p in result.positions if p not in ("Break", "ToffTL") for cell in result.assignments[p] if cell)
+
+def test_jsonl_long_export_keeps_names_with_commas():
+    records = [json.loads(line) for line in export_schedule(build_schedule(time(9, 0), time(17, 0), ROSTER), "jsonl")["long"].splitlines()]
+    assert {r["employee"] for r in records if r["position"] == "Break"} == {"Smith, J.", "Ann L."}
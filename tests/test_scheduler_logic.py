@@ -0,0 +1,98 @@
+# File: tests/test_scheduler_logic.py
+# Engine regression tests. Every fixture roster has its expected schedule at each slot length in
+# tests/fixtures/<roster>_<minutes>.csv; regenerate a fixture only for a deliberate change in scheduling.
+import copy
+import os
+from datetime import time
+
+import pytest
+
+from scheduler_logic import create_schedule, iter_schedule_rows, ScheduleCheckpoints, ScheduleStats, SLOT_MINUTES_CHOICES
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def _emp(name, start, end, brk="", tofftl=(None, None)):
+    return {"Name": name, "Shift Start": start, "Shift End": end, "Break": brk, "ToffTL Start": tofftl[0], "ToffTL End": tofftl[1]}
+
+# (store open, store close, roster). "day" has every time on the half hour.
+ROSTERS = {
+    "day": (time(6, 0), time(22, 0), [
+        _emp("Ava Lane", "6:00 AM", "2:30 PM", "10:00 AM"), _emp("Ben Cole", "05:30 AM", "1:00 PM", "9:30 AM", ("11:00 AM", "12:00 PM")),
+        _emp("Cara Diaz", "9:00 AM", "5:30 PM", "1:00 PM"), _emp("Dev Shah", "11:00", "19:30", "15:00"),
+        _emp("Eli Park", "2:00 PM", "10:00 PM", "6:00 PM"), _emp("Finn Ode", "4:30 PM", "10:30 PM"),
+        _emp("Gia Moss", "7:00 AM", "11:00 AM", "", ("8:00 AM", "9:00 AM")), _emp("Hugo Vance", "12:00 PM", "8:00 PM", "N/A")]),
+    "overnight": (time(22, 0), time(6, 0), [
+        _emp("Ava Lane", "9:00 PM", "5:00 AM", "1:00 AM"), _emp("Ben Cole", "10:00 PM", "6:30 AM", "2:30 AM", ("11:00 PM", "12:30 AM")),
+        _emp("Cara Diaz", "11:30 PM", "7:00 AM", "3:00 AM"), _emp("Dev Shah", "12:00 AM", "6:00 AM", "3:30 AM"),
+        _emp("Eli Park", "8:00 PM", "1:00 AM"), _emp("Finn Ode", "4:00 AM", "8:00 AM")]),
+    "off_grid": (time(7, 0), time(21, 0), [
+        _emp("Ava Lane", "6:45 AM", "2:15 PM", "10:20 AM"), _emp("Ben Cole", "7:10 AM", "3:10 PM", "11:05 AM"),
+        _emp("Cara Diaz", "9:00 AM", "5:00 PM", "1:00 PM", ("10:15 AM", "11:15 AM")), _emp("Dev Shah", "12:20 PM", "8:50 PM", "4:35 PM"),
+        _emp("Eli Park", "1:00 PM", "9:00 PM", "5:00 PM")]),
+    "duplicate_names": (time(6, 0), time(22, 0), [
+        _emp("Ann Lee", "6:00 AM", "2:00 PM", "10:00 AM"), _emp("Ann Long", "7:00 AM", "3:00 PM", "11:00 AM"), _emp("Ann", "9:00 AM", "1:00 PM"),
+        _emp("", "8:00 AM", "4:00 PM", "12:00 PM"), _emp("Bo Ek", "6:00 AM", "10:00 AM"), _emp("Bo Ek", "6:00 AM", "10:00 AM"),
+        _emp("Cy Do", "12:00 PM", "8:00 PM", "4:00 PM"), _emp("Dee Fox", "2:00 PM", "10:00 PM", "6:00 PM")]),
+}
+
+def _fixture_path(roster_name, slot_minutes):
+    return os.path.join(FIXTURES_DIR, f"{roster_name}_{slot_minutes}.csv")
+
+def _grid(schedule_csv):
+    lines = [line.split(",") for line in schedule_csv.splitlines()]
+    return lines[0][1:], {line[0]: line[1:] for line in lines[1:]}
+
+# A shift that starts before the schedule's start and overlaps shifts after it shares their slots
+def test_shift_across_the_schedule_start_shares_slots():
+    for store_open, store_close, early_start in ((time(6, 0), time(6, 0), "5:30 AM"), (time(6, 0), time(22, 0), "1:30 AM")):
+        times, rows = _grid(create_schedule(store_open, store_close, [_emp("Ann Lee", early_start, "9:00 AM"), _emp("Bob Ray", "6:00 AM", "9:00 AM")]))
+        assert len(times) == len(set(times)) and times[0] == early_start
+        six = times.index("6:00 AM")
+        assert {rows["Handout"][six], rows["Line Buster 1"][six]} == {"Ann L.", "Bob R."}
+
+# With every minute inside some shift the schedule wraps at its start, each clock time still once
+def test_round_the_clock_coverage_keeps_one_column_per_time():
+    roster = [_emp("Ann Lee", "6:00 AM", "3:00 PM"), _emp("Bob Ray", "2:00 PM", "11:00 PM"), _emp("Cy Do", "10:00 PM", "7:00 AM")]
+    times, rows = _grid(create_schedule(time(6, 0), time(6, 0), roster))
+    assert len(times) == 48 and len(set(times)) == 48 and times[0] == "6:00 AM"
+    assert rows["Handout"][times.index("6:30 AM")] and rows["Line Buster 1"][times.index("6:30 AM")] # Ann and Cy together
+
+# A break or ToffTL window starting just before the shift still covers its first slots
+def test_window_overlapping_the_shift_start_is_kept():
+    roster = [_emp("Ann Lee", "9:00 AM", "12:00 PM", "", ("8:30 AM", "10:00 AM")), _emp("Bob Ray", "9:00 AM", "11:00 AM", "8:45 AM")]
+    times, rows = _grid(create_schedule(time(9, 0), time(17, 0), roster))
+    assert rows["ToffTL"][:3] == ["Ann L.", "Ann L.", ""] and rows["Break"][:2] == ["Bob R.", ""]
+
+@pytest.mark.parametrize("slot_minutes", SLOT_MINUTES_CHOICES)
+@pytest.mark.parametrize("roster_name", sorted(ROSTERS))
+def test_schedule_matches_fixture(roster_name, slot_minutes):
+    with open(_fixture_path(roster_name, slot_minutes), newline="", encoding="utf-8") as f: expected = f.read()
+    assert create_schedule(*ROSTERS[roster_name], slot_minutes=slot_minutes).splitlines() == expected.splitlines()
+
+# Edits resume from the checkpoints of the previous run and must give the same schedule, and the same
+# whole-day counters, as a fresh run (stale_heap_entries depends on heap housekeeping the resume starts afresh)
+@pytest.mark.parametrize("slot_minutes", (30, 15))
+@pytest.mark.parametrize("roster_name", sorted(ROSTERS))
+def test_checkpoint_resume_matches_fresh_run(roster_name, slot_minutes):
+    store_open, store_close, roster = ROSTERS[roster_name]
+    roster = copy.deepcopy(roster); checkpoints = ScheduleCheckpoints()
+    create_schedule(store_open, store_close, roster, checkpoints=checkpoints, slot_minutes=slot_minutes)
+    edits = (lambda r: r[-1].update(Break=""), lambda r: r[-2].update({"Shift End": r[-2]["Shift Start"]}),
+             lambda r: r.append(_emp("Zed Quinn", "3:00 PM", "9:00 PM", "6:30 PM")), lambda r: None)
+    resumed = 0
+    for edit in edits:
+        edit(roster); stats = ScheduleStats()
+        resumed_csv = create_schedule(store_open, store_close, roster, checkpoints=checkpoints, stats=stats, slot_minutes=slot_minutes)
+        fresh_stats = ScheduleStats()
+        assert resumed_csv == create_schedule(store_open, store_close, roster, stats=fresh_stats, slot_minutes=slot_minutes)
+        per_day = lambda counters: {k: v for k, v in counters.items() if k not in ("resumed_slots", "stale_heap_entries")}
+        assert per_day(stats.counters) == per_day(fresh_stats.counters)
+        resumed += stats.counters["resumed_slots"]
+    assert resumed # the runs did replay part of the day
+
+# On a roster with every time on the half hour, the finer schedules' rows at :00 and :30 are the 30-minute rows
+@pytest.mark.parametrize("slot_minutes", (15, 10, 5))
+def test_fine_slots_on_the_half_hour_match_30_minute_schedule(slot_minutes):
+    half_hourly = dict(iter_schedule_rows(*ROSTERS["day"]))
+    fine = dict(iter_schedule_rows(*ROSTERS["day"], slot_minutes=slot_minutes))
+    assert {m: row for m, row in fine.items() if m % 30 == 0} == half_hourly
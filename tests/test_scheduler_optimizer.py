@@ -0,0 +1,44 @@
+# File: tests/test_scheduler_optimizer.py
+# Break optimizer tests on a seeded benchmark roster. The time budgets are generous so every search here
+# converges; results are then independent of timing and of the number of workers.
+import pytest
+
+from scheduler_benchmark import generate_roster, STORE_HOURS
+from scheduler_logic import create_schedule
+from scheduler_optimizer import optimize_breaks
+
+STORE_OPEN, STORE_CLOSE = STORE_HOURS["day"]
+ROSTER = generate_roster(12, "day", seed=1)
+
+def _optimize(roster=ROSTER, **kwargs):
+    kwargs.setdefault("time_budget", 60.0); kwargs.setdefault("max_workers", 1)
+    return optimize_breaks(STORE_OPEN, STORE_CLOSE, roster, **kwargs)
+
+def test_score_never_worse_than_the_input_roster():
+    result = _optimize()
+    assert result.converged and result.score <= result.baseline_score
+    assert result.score < result.baseline_score # this roster does have better breaks
+    assert result.schedule.to_csv() == create_schedule(STORE_OPEN, STORE_CLOSE, result.employee_data_list)
+
+def test_serial_and_parallel_runs_agree():
+    serial, parallel = _optimize(max_workers=1), _optimize(max_workers=2)
+    assert serial.converged and parallel.converged
+    assert (parallel.employee_data_list, parallel.score, parallel.candidates_scored) == (serial.employee_data_list, serial.score, serial.candidates_scored)
+    assert parallel.schedule.to_csv() == serial.schedule.to_csv()
+
+def test_zero_time_budget_returns_the_input_schedule():
+    result = _optimize(time_budget=0.0)
+    assert result.employee_data_list == ROSTER and not result.converged and result.candidates_scored == 0
+    assert result.score == result.baseline_score
+    assert result.schedule.to_csv() == create_schedule(STORE_OPEN, STORE_CLOSE, ROSTER)
+
+# Only Break fields move, and only for employees who have a break; a minimum work time off the half-hour
+# grid still leaves breaks to move
+@pytest.mark.parametrize("min_work_before", (60, 45))
+def test_only_employees_with_a_break_are_moved(min_work_before):
+    roster = [emp if i % 3 == 1 else dict(emp, Break="" if i % 3 == 0 else "N/A") for i, emp in enumerate(ROSTER)]
+    result = _optimize(roster, min_work_before=min_work_before)
+    moved = [i for i, (before, after) in enumerate(zip(roster, result.employee_data_list)) if before != after]
+    assert moved and all(i % 3 == 1 and roster[i]["Break"] for i in moved)
+    assert all(dict(after, Break=None) == dict(before, Break=None) for before, after in zip(roster, result.employee_data_list))
+    assert result.score < result.baseline_score